@@ -1,7 +1,6 @@
 import numpy as np
-from nbt_reader import nbt_reader
-from gdpc.vector_tools import distance, dropY
-from glm import ivec2
+from settlementState import ACCEPTABLE_RELATIONS, CATEGORIES, SettlementState, category_code
+from terrainPyramid import footprint_cells, rectangle_footprint
 
 
 class ObjectiveFunction:
@@ -10,31 +9,46 @@ class ObjectiveFunction:
         """
         Initializes the class instance.
         """
-        self.reader = nbt_reader()
         self.current_building = self.placed_buildings = self.terrain_map = (
             self.water_map
         ) = []
+        # Sub-scores of the last total_fitness call, empty if the building overlapped
+        self.terms = {}
 
-    def set_params(self, current, placed, map, water_map, offset_x, offset_z):
+    def set_params(
+        self, current, placed, map, water_map, offset_x, offset_z, scale=1, footprint=None
+    ):
         """
         Sets parameters to evaluate the building.
 
         Parameters:
         - current: The building currently being evaluated
-        - placed: A list of buildings already placed
+        - placed: A SettlementState or a list of buildings already placed
         - map: The height map of the area
         - water_map: The map indicating water blocks
         - offset_x: The x-axis offset for the current building's position
         - offset_z: The z-axis offset for the current building's position
+        - scale: The number of blocks per map cell side, larger than 1 for downsampled maps (default is 1)
+        - footprint: The x and z offsets of the blocks the building stands on, the whole rectangle by default
         """
 
+        if footprint is None:
+            size_x, _, size_z = current[1].size
+            footprint = rectangle_footprint(size_x, size_z)
+
+        self.scale = scale
+        self.footprint = footprint
         self.offx = offset_x
         self.offz = offset_z
+        if not isinstance(placed, SettlementState):
+            placed = SettlementState.from_buildings(placed)
+
         self.current_building = current
+        self.current_category = category_code(str(current[0]))
         self.placed_buildings = placed
         self.terrain_map = map
         self.water_map = water_map
-        self.mini_terrain, self.mini_water = self.sub_map()
+        self.mini_terrain, self.mini_water, self.cell_weights = self.sub_map()
         self.building_base = self.get_base_area()
 
     def check_floating(self):
@@ -45,17 +59,18 @@ class ObjectiveFunction:
         - A score representing the penalty for the building being above the terrain or water.
         """
         counter = 0
-        building_height = self.mini_terrain[0, 0]
+        building_height = self.base_height
         category = self.get_category(self.current_building)
 
         mask = self.mini_terrain < building_height
         distances = np.abs(self.mini_terrain[mask] - building_height)
 
-        counter -= np.sum(distances)
+        # Every cell counts once per footprint block standing on it
+        counter -= np.dot(distances, self.cell_weights[mask])
         if category == "water":
-            counter -= 3 * np.sum(self.mini_water == 0)
+            counter -= 3 * np.sum(self.cell_weights[self.mini_water == 0])
         else:
-            counter -= 3 * np.sum(self.mini_water == 1)
+            counter -= 3 * np.sum(self.cell_weights[self.mini_water == 1])
 
         return counter
 
@@ -66,11 +81,7 @@ class ObjectiveFunction:
         Returns:
         - True if there is an overlap, otherwise False.
         """
-        for building in self.placed_buildings:
-            if self.current_building[1].collides(building[1]):
-                return True
-
-        return False
+        return self.placed_buildings.collides(self.current_building[1])
 
     def building_type_diversity(self):
         """
@@ -79,13 +90,7 @@ class ObjectiveFunction:
         Returns:
         - The number of unique building categories.
         """
-        placed_cat = [self.get_category(self.current_building)]
-        for building in self.placed_buildings:
-            placed_cat.append(self.get_category(building))
-
-        unique_categories = set(map(tuple, placed_cat))
-
-        return len(unique_categories)
+        return self.placed_buildings.diversity_with(self.current_category)
 
     def is_duplicate(self):
         """
@@ -94,7 +99,7 @@ class ObjectiveFunction:
         Returns:
         - -1 if the current building is a duplicate, otherwise 1.
         """
-        if self.current_building in self.placed_buildings:
+        if self.placed_buildings.contains(self.current_building):
             return -1
 
         return 1
@@ -106,7 +111,7 @@ class ObjectiveFunction:
         Returns:
         - The total number of buildings.
         """
-        return len(self.placed_buildings) + 1
+        return self.placed_buildings.count + 1
 
     def break_terrain(self):
         """
@@ -116,15 +121,31 @@ class ObjectiveFunction:
         - A score representing the penalty for terrain breakage caused by the building.
         """
         counter = 0
-        building_height = self.mini_terrain[0, 0]
+        building_height = self.base_height
 
         mask = self.mini_terrain >= building_height
         distances = np.abs(self.mini_terrain[mask] - building_height)
 
-        counter -= np.sum(distances)
+        counter -= np.dot(distances, self.cell_weights[mask])
 
         return counter
 
+    def corner_distances(self):
+        """
+        Calculates the smallest distance between the (x, z) corners of the current building and each placed building.
+
+        Returns:
+        - An array with one distance per placed building.
+        """
+        x_pos, _, z_pos = self.current_building[1].begin
+        max_x, _, max_z = self.current_building[1].end
+        corners = np.array([[x_pos, z_pos], [max_x, max_z]])
+
+        placed = self.placed_buildings.footprints()
+        offsets = corners[None, :, None, :] - placed[:, None, :, :]
+
+        return np.sqrt(np.sum(offsets**2, axis=-1)).min(axis=(1, 2))
+
     def building_spacing(self, min_dist=3, max_dist=30):
         """
         Checks the spacing between the current building and already placed buildings to ensure it falls within a specified range.
@@ -136,30 +157,10 @@ class ObjectiveFunction:
         Returns:
         - 1 if the spacing is acceptable, otherwise -1.
         """
-        max_x, _, max_z = self.current_building[1].end
-        x_pos, _, z_pos = self.current_building[1].begin
-
-        original_min = ivec2(x_pos, z_pos)
-        original_max = ivec2(max_x, max_z)
+        smallest_dist = self.corner_distances()
 
-        for building in self.placed_buildings:
-            max_x2, _, max_z2 = building[1].end
-            x_pos2, _, z_pos2 = building[1].begin
-
-            alt_min = ivec2(x_pos2, z_pos2)
-            alt_max = ivec2(max_x2, max_z2)
-
-            min_min_dist = distance(original_min, alt_min)
-            min_max_dist = distance(original_min, alt_max)
-            max_min_dist = distance(original_max, alt_min)
-            max_max_dist = distance(original_max, alt_max)
-
-            smallest_dist = np.min(
-                [min_min_dist, min_max_dist, max_min_dist, max_max_dist]
-            )
-
-            if smallest_dist < min_dist and smallest_dist > max_dist:
-                return -1
+        if np.any((smallest_dist < min_dist) & (smallest_dist > max_dist)):
+            return -1
 
         return 1
 
@@ -181,70 +182,25 @@ class ObjectiveFunction:
             - neighbors: The number of closest neighbors to consider (default is 3).
 
             Returns:
-            - A list of the closest buildings.
+            - The indices of the closest placed buildings.
             """
-            closest_buildings = []
-            x_pos, _, z_pos = self.current_building[1].begin
-            max_x, _, max_z = self.current_building[1].end
-            original_min = ivec2(x_pos, z_pos)
-            original_max = ivec2(max_x, max_z)
-
-            for building in self.placed_buildings:
-                max_x2, _, max_z2 = building[1].end
-                x_pos2, _, z_pos2 = building[1].begin
-
-                alt_min = ivec2(x_pos2, z_pos2)
-                alt_max = ivec2(max_x2, max_z2)
-
-                min_min_dist = distance(original_min, alt_min)
-                min_max_dist = distance(original_min, alt_max)
-                max_min_dist = distance(original_max, alt_min)
-                max_max_dist = distance(original_max, alt_max)
-
-                new_min = np.min(
-                    [min_min_dist, min_max_dist, max_min_dist, max_max_dist]
-                )
+            distances = self.corner_distances()
 
-                closest_buildings.append((building, new_min))
-
-            # Sort the closest buildings based on their distances
-            closest_buildings.sort(key=lambda x: x[1])
-
-            if neighbors > len(closest_buildings) or neighbors < 0:
+            if neighbors > len(distances) or neighbors < 0:
                 neighbors = len(
-                    closest_buildings
+                    distances
                 )  # Use the full range if neighbors is out of bounds
 
-            return [building[0] for building in closest_buildings[:neighbors]]
+            # Stable sort keeps the placement order between equally distant buildings
+            return np.argsort(distances, kind="stable")[:neighbors]
 
         counter = 0
-        acceptable_relations = {
-            "entertainment": ["residential", "entertainment", "water"],
-            "food": ["residential", "food", "production", "water"],
-            "gov": ["residential", "water", "gov"],
-            "production": ["food", "production", "residential", "water"],
-            "residential": [
-                "entertainment",
-                "residential",
-                "food",
-                "production",
-                "water",
-            ],
-            "water": [
-                "entertainment",
-                "residential",
-                "food",
-                "production",
-                "gov",
-                "water",
-            ],
-        }
         current_category = self.get_category(self.current_building)
-        current_category_relations = acceptable_relations[current_category]
+        current_category_relations = ACCEPTABLE_RELATIONS[current_category]
 
         neighbors = get_closest_buildings()
-        for neighbor in neighbors:
-            neighbor_category = self.get_category(neighbor[0])
+        for code in self.placed_buildings.categories[neighbors]:
+            neighbor_category = CATEGORIES[code] if code >= 0 else None
             if neighbor_category in current_category_relations:
                 counter += 1
             else:
@@ -271,20 +227,9 @@ class ObjectiveFunction:
         Returns:
         - The category of the building as a string.
         """
-        building_category = None
-        category_list = {
-            "entertainment",
-            "food",
-            "gov",
-            "residential",
-            "production",
-            "water",
-        }
-        for categories in category_list:
-            if categories in building[0]:
-                building_category = categories
+        code = category_code(str(building[0]))
 
-        return building_category
+        return CATEGORIES[code] if code >= 0 else None
 
     def cord2map(self, x, z):
         """
@@ -304,39 +249,37 @@ class ObjectiveFunction:
 
     def sub_map(self):
         """
-        Extracts a sub-map of the terrain and water for the current building.
+        Extracts the terrain and water under the footprint of the current building.
+        Also sets the base height, the terrain height under the first footprint block where the building is placed.
 
         Returns:
-        - A tuple (building_map, building_water_map) representing the terrain and water maps for the building.
+        - A tuple (building_map, building_water_map, weights) with the terrain and water of every map cell
+          under the footprint and the number of footprint blocks standing on each cell.
         """
         if len(self.current_building) == 0:
-            return None, None
+            return None, None, None
 
         x0, _, z0 = self.current_building[1].begin
         x0, z0 = self.cord2map(x0, z0)
 
-        x_max, _, z_max = self.reader.get_data(self.current_building[0], "size")
+        anchor_x = (x0 + self.footprint[0][0]) // self.scale
+        anchor_z = (z0 + self.footprint[1][0]) // self.scale
+        self.base_height = self.terrain_map[anchor_x, anchor_z]
 
-        x1 = x0 + x_max.value - 1
-        z1 = z0 + z_max.value - 1
+        x, z, weights = footprint_cells(
+            x0, z0, self.footprint, self.terrain_map.shape, self.scale
+        )
 
-        # Use array slicing to extract the subset
-        building_map = self.terrain_map[x0 : x1 + 1, z0 : z1 + 1]
-        building_water_map = self.water_map[x0 : x1 + 1, z0 : z1 + 1]
-
-        return building_map, building_water_map
+        return self.terrain_map[x, z], self.water_map[x, z], weights
 
     def get_base_area(self):
         """
-        Calculates the base area of the current building.
+        Calculates the base area of the current building, the number of blocks it stands on.
 
         Returns:
         - The base area of the building.
         """
-        start = dropY(self.current_building[1].begin)
-        end = dropY(self.current_building[1].end)
-
-        return abs(start[0] - end[0]) * abs(start[1] - end[1])
+        return len(self.footprint[0])
 
     def total_fitness(self):
         """
@@ -345,6 +288,7 @@ class ObjectiveFunction:
         Returns:
         - The total fitness score of the building.
         """
+        self.terms = {}
         if self.check_overlap():
             return -100
 
@@ -372,4 +316,19 @@ class ObjectiveFunction:
         # Compute the total score
         total_score = (individual_score + group_score + relation_score) / 3
 
+        self.terms = {
+            "total_buildings": total_buildings,
+            "break_terrain": break_terrain,
+            "floating": floating,
+            "spacing": spacing,
+            "diversity": cat_div,
+            "large": large,
+            "relations": relations,
+            "max_relations": max_relations,
+            "duplicate": duplicate,
+            "individual_score": individual_score,
+            "relation_score": relation_score,
+            "group_score": group_score,
+        }
+
         return total_score
\ No newline at end of file
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from buildingCatalog import load_catalog, register_catalogs
+from sharedWorld import SharedWorld, SharedWorldView
+
+PARAMETERS = (
+    "time",
+    "threshold",
+    "depth",
+    "n_steps",
+    "engine",
+    "min_spacing",
+    "dataset",
+    "variants",
+    "coarse_levels",
+)
+DEFAULTS = {
+    "time": 600,
+    "threshold": 0.5,
+    "depth": 1,
+    "n_steps": 40,
+    "engine": "bayes",
+    "min_spacing": 0,
+    "dataset": "normal",
+    "variants": False,
+    "coarse_levels": 0,
+}
+
+
+def expand_jobs(config):
+    """
+    Expands a batch config into one run per job and seed.
+
+    Parameters:
+    - config: The parsed batch config
+
+    Returns:
+    - A list of run dictionaries with the name, world source, seed, trace folder and optimizer parameters
+    """
+    defaults = {**DEFAULTS, **config.get("defaults", {})}
+    runs = []
+    for index, job in enumerate(config["jobs"]):
+        if ("snapshot" in job) == ("build_area" in job):
+            raise ValueError(
+                f"Job {index} must define exactly one of 'snapshot' or 'build_area'"
+            )
+
+        parameters = {key: job.get(key, defaults[key]) for key in PARAMETERS}
+        name = job.get("name", f"job{index}")
+        trace = job.get("trace", config.get("trace"))
+        for seed in job.get("seeds", [job.get("seed", 0)]):
+            runs.append(
+                {
+                    "name": name,
+                    "snapshot": job.get("snapshot"),
+                    "build_area": job.get("build_area"),
+                    "seed": seed,
+                    "trace": os.path.join(trace, f"{name}_seed{seed}") if trace else None,
+                    "parameters": parameters,
+                }
+            )
+
+    return runs
+
+
+_worlds = {}
+
+
+def init_worker(catalogs, worlds=None):
+    """
+    Prepares a worker process with the catalogs parsed and the worlds published by the parent process.
+
+    Parameters:
+    - catalogs: A list of BuildingCatalogs
+    - worlds: Dictionary from snapshot path to the descriptor of its SharedWorld
+    """
+    register_catalogs(catalogs)
+    for snapshot, descriptor in (worlds or {}).items():
+        _worlds[snapshot] = SharedWorldView(descriptor)
+
+
+def run_generation(run):
+    """
+    Generates one settlement.
+
+    Parameters:
+    - run: A run dictionary from expand_jobs
+
+    Returns:
+    - A dictionary with the run, its duration and the placed buildings with their scores
+    """
+    from buildingHandler import generateRandomSample
+    from optimizationAlgorithm import BayesOpts
+
+    start_time = time.time()
+    if run["snapshot"] in _worlds:
+        generator = generateRandomSample(shared=_worlds[run["snapshot"]])
+    else:
+        generator = generateRandomSample(
+            snapshot=run["snapshot"], build_area=run["build_area"]
+        )
+    optimizer = BayesOpts(
+        seed=run["seed"], generator=generator, trace=run.get("trace"), **run["parameters"]
+    )
+    results = optimizer.optimize()
+
+    buildings = [
+        generator.create_building(building, x, z)
+        for x, z, building in map(optimizer.node2building, results)
+    ]
+    settlement = generator.score_settlement(buildings)
+
+    placements = []
+    for index, (node, (building, box)) in enumerate(zip(results, buildings)):
+        placements.append(
+            {
+                "building": building,
+                "begin": [int(value) for value in box.begin],
+                "size": [int(value) for value in box.size],
+                "params": {key: float(value) for key, value in node.params.items()},
+                "score": float(node.score),
+                "settlement_scores": {
+                    key: float(settlement[key][index])
+                    for key in ("individual_score", "group_score", "total_score")
+                },
+            }
+        )
+
+    return {
+        **run,
+        "elapsed": time.time() - start_time,
+        "placements": placements,
+    }
+
+
+def run_batch(config, workers=None, output=None):
+    """
+    Runs all generations of a batch config in one long-lived worker pool and writes their results.
+    Every run is written to <output>/<name>_seed<seed>.json and appended to <output>/results.jsonl.
+
+    Parameters:
+    - config: The parsed batch config
+    - workers: The number of worker processes (default is the config's "workers" or the CPU count)
+    - output: The output directory (default is the config's "output" or "batch_output")
+
+    Returns:
+    - A list with the result of every run
+    """
+    runs = expand_jobs(config)
+    workers = workers or config.get("workers") or os.cpu_count()
+    output = output or config.get("output", "batch_output")
+    os.makedirs(output, exist_ok=True)
+
+    # Parse every catalog once, workers receive them when they start
+    catalogs = [
+        load_catalog(dataset, variants)
+        for dataset, variants in sorted(
+            {
+                (run["parameters"]["dataset"], run["parameters"]["variants"])
+                for run in runs
+            }
+        )
+    ]
+
+    # Load every snapshot once, workers attach to the shared copy
+    from buildingHandler import generateRandomSample
+
+    worlds = {}
+    for snapshot in sorted({run["snapshot"] for run in runs if run["snapshot"]}):
+        levels = max(
+            run["parameters"]["coarse_levels"] for run in runs if run["snapshot"] == snapshot
+        )
+        worlds[snapshot] = SharedWorld(
+            generateRandomSample(snapshot=snapshot), levels, capacity=0
+        )
+
+    try:
+        return run_pool(runs, catalogs, worlds, workers, output)
+    finally:
+        for world in worlds.values():
+            world.close()
+
+
+def run_pool(runs, catalogs, worlds, workers, output):
+    """
+    Runs generations in a worker pool and writes their results as they finish.
+
+    Parameters:
+    - runs: A list of run dictionaries from expand_jobs
+    - catalogs: A list of BuildingCatalogs for the workers
+    - worlds: Dictionary from snapshot path to its SharedWorld
+    - workers: The number of worker processes
+    - output: The output directory
+
+    Returns:
+    - A list with the result of every run
+    """
+    descriptors = {snapshot: world.descriptor for snapshot, world in worlds.items()}
+
+    outputs = []
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(catalogs, descriptors)
+    ) as pool:
+        futures = {pool.submit(run_generation, run): run for run in runs}
+        with open(os.path.join(output, "results.jsonl"), "a") as summary:
+            for future in as_completed(futures):
+                run = futures[future]
+                try:
+                    result = future.result()
+                except Exception as error:
+                    result = {**run, "error": repr(error)}
+                    print(f"Run {run['name']} seed {run['seed']} failed: {error!r}")
+                else:
+                    print(
+                        f"Run {run['name']} seed {run['seed']} placed "
+                        f"{len(result['placements'])} buildings in {result['elapsed']:.1f}s"
+                    )
+
+                file_name = f"{run['name']}_seed{run['seed']}.json"
+                with open(os.path.join(output, file_name), "w") as file:
+                    json.dump(result, file, indent=2)
+                summary.write(json.dumps(result) + "\n")
+                summary.flush()
+                outputs.append(result)
+
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate settlements for many build areas and seeds without a game client."
+    )
+    parser.add_argument("config", nargs="?", help="Path to the batch config (JSON)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    parser.add_argument("--output", help="Directory to write the results to")
+    parser.add_argument(
+        "--save-snapshot",
+        metavar="PATH",
+        help="Save the build area set in game as a snapshot for batch runs and exit",
+    )
+    args = parser.parse_args()
+
+    if args.save_snapshot:
+        from buildingHandler import generateRandomSample
+
+        generateRandomSample().save_snapshot(args.save_snapshot)
+    elif args.config:
+        with open(args.config) as file:
+            run_batch(json.load(file), args.workers, args.output)
+    else:
+        parser.error("a config is required unless --save-snapshot is given")
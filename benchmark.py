@@ -0,0 +1,230 @@
+import argparse
+import subprocess
+import sys
+import time
+import numpy as np
+
+MODULES = (
+    "settlementState",
+    "occupancyGrid",
+    "ObjectiveFunction",
+    "buildingCatalog",
+    "buildingHandler",
+    "optimizationAlgorithm",
+    "batch",
+    "mockServer",
+)
+
+WORKER_BOOTSTRAP = """
+import time
+start = time.perf_counter()
+from buildingHandler import generateRandomSample
+from optimizationAlgorithm import BayesOpts
+imported = time.perf_counter()
+optimizer = BayesOpts(generator=generateRandomSample(snapshot={snapshot!r}), dataset={dataset!r}, engine="evolutionary", cache=False)
+constructed = time.perf_counter()
+optimizer.test_building_loc(optimizer.per_min_x, optimizer.per_min_z, 0)
+evaluated = time.perf_counter()
+print(imported - start, constructed - imported, evaluated - constructed)
+"""
+
+
+def run_python(code):
+    """
+    Runs code in a fresh interpreter.
+
+    Parameters:
+    - code: The code to run
+
+    Returns:
+    - A tuple with the wall time of the process and its standard output
+    """
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return time.perf_counter() - start, output
+
+
+def startup(repeats=3):
+    """
+    Measures the cold import time of every module in a fresh interpreter.
+
+    Parameters:
+    - repeats: The number of measurements per module, the fastest is reported
+    """
+    interpreter = min(run_python("pass")[0] for _ in range(repeats))
+    print(f"{'interpreter':<24}{interpreter * 1000:8.0f}ms")
+
+    for module in MODULES:
+        code = (
+            "import time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "print(time.perf_counter() - start)"
+        )
+        seconds = min(float(run_python(code)[1]) for _ in range(repeats))
+        print(f"{module:<24}{seconds * 1000:8.0f}ms")
+
+
+def worker_startup(snapshot, dataset, repeats=3):
+    """
+    Measures how long an evaluation-only worker takes from a fresh interpreter to its first evaluation.
+
+    Parameters:
+    - snapshot: The world snapshot the worker evaluates on
+    - dataset: The building dataset
+    - repeats: The number of measurements, the fastest is reported
+    """
+    code = WORKER_BOOTSTRAP.format(snapshot=snapshot, dataset=dataset)
+    runs = [run_python(code) for _ in range(repeats)]
+    wall, output = min(runs, key=lambda run: run[0])
+    imported, constructed, evaluated = (float(value) for value in output.split()[-3:])
+
+    print(
+        f"Worker startup {wall * 1000:.0f}ms: imports {imported * 1000:.0f}ms, "
+        f"setup {constructed * 1000:.0f}ms, first evaluation {evaluated * 1000:.0f}ms"
+    )
+
+
+def throughput(snapshot, dataset, evaluations=500, seed=0):
+    """
+    Measures the number of evaluations per second at random locations.
+
+    Parameters:
+    - snapshot: The world snapshot to evaluate on
+    - dataset: The building dataset
+    - evaluations: The number of evaluations
+    - seed: The random seed of the locations
+    """
+    from buildingHandler import generateRandomSample
+    from optimizationAlgorithm import BayesOpts
+
+    optimizer = BayesOpts(
+        generator=generateRandomSample(snapshot=snapshot), dataset=dataset, cache=False
+    )
+    rng = np.random.default_rng(seed)
+    candidates = {
+        "x": rng.uniform(optimizer.per_min_x, optimizer.per_max_x, evaluations),
+        "z": rng.uniform(optimizer.per_min_z, optimizer.per_max_z, evaluations),
+        "building_id": rng.uniform(0, len(optimizer.dataset) - 1, evaluations),
+    }
+
+    start = time.perf_counter()
+    for x, z, building_id in zip(*candidates.values()):
+        optimizer.test_building_loc(x, z, building_id)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    optimizer.test_building_batch(candidates)
+    batched = time.perf_counter() - start
+
+    print(
+        f"Evaluations per second: {evaluations / single:.0f} one by one, "
+        f"{evaluations / batched:.0f} batched"
+    )
+
+
+def engines(snapshot, dataset, time_limit=60, seed=0):
+    """
+    Compares the search engines by the score they reach per CPU second.
+
+    Parameters:
+    - snapshot: The world snapshot to generate on
+    - dataset: The building dataset
+    - time_limit: The time limit of every run in seconds
+    - seed: The random seed of the runs
+    """
+    from buildingHandler import generateRandomSample
+    from optimizationAlgorithm import BayesOpts
+
+    for engine in BayesOpts.engines:
+        optimizer = BayesOpts(
+            time=time_limit,
+            engine=engine,
+            seed=seed,
+            dataset=dataset,
+            generator=generateRandomSample(snapshot=snapshot),
+            cache=False,
+        )
+        start = time.process_time()
+        results = optimizer.optimize()
+        cpu = time.process_time() - start
+
+        score = sum(node.score for node in results)
+        print(
+            f"{engine:<14}{len(results):4d} buildings, total score {score:8.3f}, "
+            f"{score / cpu:.4f} per CPU second"
+        )
+
+
+def io(snapshot, dataset, latency=0.0, bandwidth=None, buildings=5, seed=0):
+    """
+    Measures loading the world and placing buildings through a local mock GDMC HTTP server.
+    The mock server does not simulate block physics, so blocks that would fall or break in game are not detected.
+    It counts the blocks sent with block updates on instead, which should stay 0.
+
+    Parameters:
+    - snapshot: The world snapshot to serve, a synthetic world is served if None
+    - dataset: The building dataset
+    - latency: Seconds added to every request
+    - bandwidth: Transfer limit in bytes per second, None is unlimited
+    - buildings: The number of buildings placed per placement method
+    - seed: The random seed of the buildings and the synthetic world
+    """
+    from buildingCatalog import load_catalog
+    from buildingHandler import generateRandomSample
+    from mockServer import MockServer, MockWorld
+
+    world = MockWorld.from_snapshot(snapshot) if snapshot else MockWorld.synthetic(seed=seed)
+    server = MockServer(world, port=0, latency=latency, bandwidth=bandwidth).start()
+
+    start = time.perf_counter()
+    generator = generateRandomSample(host=server.url)
+    print(f"World load {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    rng = np.random.default_rng(seed)
+    paths = load_catalog(dataset).paths
+    for diff in (False, True):
+        server.stats.update(requests=0, bytes_in=0, bytes_out=0, updated_blocks=0)
+        start = time.perf_counter()
+        for building in rng.choice(paths, buildings):
+            x = rng.integers(generator.per_min_x, generator.per_max_x)
+            z = rng.integers(generator.per_min_z, generator.per_max_z)
+            generator.create_building(str(building), x, z, build=True, diff=diff)
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{'diff' if diff else 'structure'} placement: {buildings / elapsed:.2f} buildings/s, "
+            f"{server.stats['requests']} requests, {server.stats['bytes_in'] / 1e6:.1f}MB sent, "
+            f"{server.stats['updated_blocks']} blocks with block updates"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the settlement generator.")
+    parser.add_argument(
+        "benchmark", choices=("startup", "worker", "throughput", "engines", "io", "all")
+    )
+    parser.add_argument("--snapshot", help="World snapshot saved with batch.py --save-snapshot")
+    parser.add_argument("--dataset", default="normal")
+    parser.add_argument("--time", type=int, default=60, help="Time limit of engine runs")
+    parser.add_argument("--latency", type=float, default=0, help="Mock server latency of io runs")
+    parser.add_argument("--bandwidth", type=float, help="Mock server bytes per second of io runs")
+    args = parser.parse_args()
+
+    if args.benchmark not in ("startup", "io") and args.snapshot is None:
+        parser.error(f"the {args.benchmark} benchmark needs --snapshot")
+
+    if args.benchmark in ("startup", "all"):
+        startup()
+    if args.benchmark in ("worker", "all"):
+        worker_startup(args.snapshot, args.dataset)
+    if args.benchmark in ("throughput", "all"):
+        throughput(args.snapshot, args.dataset)
+    if args.benchmark in ("engines", "all"):
+        engines(args.snapshot, args.dataset, args.time)
+    if args.benchmark in ("io", "all"):
+        io(args.snapshot, args.dataset, args.latency, args.bandwidth)
@@ -0,0 +1,110 @@
+from glm import ivec2, ivec3
+
+
+class Box:
+
+    def __init__(self, offset=ivec3(), size=ivec3()):
+        """
+        Box of blocks with the attributes of gdpc.vector_tools.Box that placements use.
+        Evaluations only need the corners of a placement, so they do not import gdpc,
+        which loads the editor, scipy, scikit-image and matplotlib with it.
+
+        Parameters:
+        - offset: The first block of the box
+        - size: The number of blocks along each axis
+        """
+        self.offset = ivec3(offset)
+        self.size = ivec3(size)
+
+    @classmethod
+    def between(cls, cornerA, cornerB):
+        """
+        Parameters:
+        - cornerA: A corner block of the box
+        - cornerB: The opposite corner block, inclusive
+
+        Returns:
+        - The Box spanning both corners
+        """
+        begin = ivec3(min(cornerA.x, cornerB.x), min(cornerA.y, cornerB.y), min(cornerA.z, cornerB.z))
+        last = ivec3(max(cornerA.x, cornerB.x), max(cornerA.y, cornerB.y), max(cornerA.z, cornerB.z))
+
+        return cls(begin, last - begin + 1)
+
+    @property
+    def begin(self):
+        """
+        The first block of the box.
+        """
+        return self.offset
+
+    @property
+    def end(self):
+        """
+        The block after the last block of the box.
+        """
+        return self.offset + self.size
+
+    @property
+    def last(self):
+        """
+        The last block of the box.
+        """
+        return self.end - 1
+
+    def collides(self, other):
+        """
+        Parameters:
+        - other: Another Box
+
+        Returns:
+        - True if the boxes overlap or touch, like gdpc.vector_tools.Box.collides
+        """
+        return all(
+            self.begin[axis] <= other.end[axis] and self.end[axis] >= other.begin[axis]
+            for axis in range(3)
+        )
+
+    def __eq__(self, other):
+        return tuple(self.offset) == tuple(other.offset) and tuple(self.size) == tuple(other.size)
+
+    def __repr__(self):
+        return f"Box(offset={tuple(self.offset)}, size={tuple(self.size)})"
+
+
+class Rect:
+
+    def __init__(self, offset=ivec2(), size=ivec2()):
+        """
+        Rectangle of columns with the attributes of gdpc.vector_tools.Rect that build areas use.
+
+        Parameters:
+        - offset: The first column of the rectangle
+        - size: The number of columns along x and z
+        """
+        self.offset = ivec2(offset)
+        self.size = ivec2(size)
+
+    @property
+    def begin(self):
+        """
+        The first column of the rectangle.
+        """
+        return self.offset
+
+    @property
+    def end(self):
+        """
+        The column after the last column of the rectangle.
+        """
+        return self.offset + self.size
+
+    @property
+    def last(self):
+        """
+        The last column of the rectangle.
+        """
+        return self.end - 1
+
+    def __repr__(self):
+        return f"Rect(offset={tuple(self.offset)}, size={tuple(self.size)})"
@@ -0,0 +1,111 @@
+import os
+import numpy as np
+from settlementState import category_code
+from structureVariants import (
+    ROTATIONS,
+    cache_structure,
+    get_variant,
+    variant_footprint,
+    variant_name,
+    variant_size,
+)
+
+
+class BuildingCatalog:
+
+    def __init__(self, dataset, variants=False):
+        """
+        Parsed building catalog of a dataset.
+        Every nbt file is read once, the catalog is plain data so it can be shared with worker processes.
+
+        Parameters:
+        - dataset: The name of the folder in nbtData containing the nbt files
+        - variants: If True every structure is added in all rotations and mirrored, otherwise only as authored
+        """
+        self.dataset = dataset
+        self.variants = variants
+
+        self.paths = []
+        sizes = []
+        for path in self.list_nbt_files(dataset):
+            size = get_variant(path).size
+            transforms = (
+                [(rotation, mirror) for rotation in ROTATIONS for mirror in (False, True)]
+                if variants
+                else [(0, False)]
+            )
+            for rotation, mirror in transforms:
+                self.paths.append(variant_name(path, rotation, mirror))
+                sizes.append(variant_size(size, rotation))
+
+        self.sizes = np.array(sizes, dtype=int).reshape(-1, 3)
+        self.categories = np.array(
+            [category_code(path) for path in self.paths], dtype=np.int8
+        )
+        # Bottom layer cells of every building, the terrain it actually stands on
+        self.footprints = [variant_footprint(path) for path in self.paths]
+
+    @staticmethod
+    def list_nbt_files(dataset):
+        '''
+        Lists all the buildings from the chosen dataset.
+
+        Parameters:
+        - File path the folder containing the nbt files for the dataset
+
+        '''
+        nbt_files = []
+        path = os.path.join("nbtData", dataset)
+
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                if file_name.endswith(".nbt"):
+                    nbt_files.append(os.path.join(root, file_name))
+        return nbt_files
+
+    def footprint_sizes(self):
+        """
+        Returns:
+        - An (n, 2) array with the x and z size of every building
+        """
+        return self.sizes[:, [0, 2]]
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, building_id):
+        return self.paths[building_id]
+
+
+_catalogs = {}
+
+
+def load_catalog(dataset, variants=False):
+    """
+    Returns the catalog of a dataset, parsing it only on the first call in this process.
+
+    Parameters:
+    - dataset: The name of the folder in nbtData containing the nbt files
+    - variants: If True the catalog contains all rotated and mirrored variants
+
+    Returns:
+    - The BuildingCatalog of the dataset
+    """
+    if (dataset, variants) not in _catalogs:
+        register_catalogs([BuildingCatalog(dataset, variants)])
+
+    return _catalogs[(dataset, variants)]
+
+
+def register_catalogs(catalogs):
+    """
+    Registers already parsed catalogs, used to hand the catalog to worker processes.
+    The sizes and footprints of their buildings are looked up from the catalog from then on.
+
+    Parameters:
+    - catalogs: A list of BuildingCatalogs
+    """
+    for catalog in catalogs:
+        _catalogs[(catalog.dataset, catalog.variants)] = catalog
+        for path, size, footprint in zip(catalog.paths, catalog.sizes, catalog.footprints):
+            cache_structure(path, size, footprint)
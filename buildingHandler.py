@@ -1,22 +1,37 @@
 import sys
 import numpy as np
-from gdpc import __url__, Editor
-from gdpc.exceptions import InterfaceConnectionError, BuildAreaNotSetError
-from gdpc.vector_tools import Box
 from glm import ivec2, ivec3
+from buildingBox import Box, Rect
 from ObjectiveFunction import ObjectiveFunction
 from nbt_reader import nbt_reader
+from settlementScorer import SettlementScorer
+from structureVariants import structure_size, variant_footprint
 
 
 class generateRandomSample:
 
-    def __init__(self):
+    def __init__(self, snapshot=None, build_area=None, host=None, shared=None):
         """
         Initializes the class instance.
+
+        Parameters:
+        - snapshot: Optional path to a world snapshot saved with save_snapshot, no editor connection is made when given
+        - build_area: Optional (x0, z0, x1, z1) build area to load instead of the build area set in game
+        - host: Optional address of the GDMC HTTP interface, e.g. a mockServer, the gdpc default is used otherwise
+        - shared: Optional SharedWorldView to use the world data of, without copying it
         """
-        self.editor = Editor()
-        self.check_editor_connection()
-        self.initialize_slice()
+        self.host = host
+        self.shared = shared
+        self._editor = None
+        if shared is not None:
+            self.worldSlice = None
+            self.load_shared(shared)
+        elif snapshot is not None:
+            self.worldSlice = None
+            self.load_snapshot(snapshot)
+        else:
+            self.initialize_slice(build_area)
+
         self.per_min_x, self.per_max_x, self.per_min_z, self.per_max_z = (
             self.perimeter_min_max()
         )
@@ -25,10 +40,26 @@ class generateRandomSample:
         self.reader = nbt_reader()
         self.obj_func = ObjectiveFunction()
 
+    @property
+    def editor(self):
+        """
+        The editor connected to the GDMC HTTP interface, created and checked on first use.
+        """
+        if self._editor is None:
+            from gdpc import Editor
+
+            self._editor = Editor() if self.host is None else Editor(host=self.host)
+            self.check_editor_connection()
+
+        return self._editor
+
     def check_editor_connection(self):
         """
         Checks the connection to the GDMC HTTP interface.
         """
+        from gdpc import __url__
+        from gdpc.exceptions import InterfaceConnectionError
+
         try:
             self.editor.checkConnection()
         except InterfaceConnectionError:
@@ -40,24 +71,79 @@ class generateRandomSample:
             )
             sys.exit(1)
 
-    def initialize_slice(self):
+    def initialize_slice(self, build_area=None):
         """
         Initializes the world slice.
+
+        Parameters:
+        - build_area: Optional (x0, z0, x1, z1) build area, the build area set in game is used otherwise
         """
-        try:
-            self.buildArea = self.editor.getBuildArea()
-        except BuildAreaNotSetError:
-            print(
-                "Error: failed to get the build area!\n"
-                "Make sure to set the build area with the /setbuildarea command in-game.\n"
-                "For example: /setbuildarea ~0 0 ~0 ~64 200 ~64"
-            )
-            sys.exit(1)
+        from gdpc.exceptions import BuildAreaNotSetError
+        from gdpc.vector_tools import Rect as SliceRect
+
+        if build_area is not None:
+            x0, z0, x1, z1 = build_area
+            self.buildRect = SliceRect.between(ivec2(x0, z0), ivec2(x1, z1))
+        else:
+            try:
+                self.buildArea = self.editor.getBuildArea()
+            except BuildAreaNotSetError:
+                print(
+                    "Error: failed to get the build area!\n"
+                    "Make sure to set the build area with the /setbuildarea command in-game.\n"
+                    "For example: /setbuildarea ~0 0 ~0 ~64 200 ~64"
+                )
+                sys.exit(1)
+
+            self.buildRect = self.buildArea.toRect()
 
-        self.buildRect = self.buildArea.toRect()
         self.worldSlice = self.editor.loadWorldSlice(self.buildRect)
+        self.heightmaps = {
+            name: np.array(self.worldSlice.heightmaps[name])
+            for name in ("MOTION_BLOCKING_NO_LEAVES", "OCEAN_FLOOR")
+        }
 
-    def create_building(self, building_data, x_pos, z_pos, build=False):
+    def save_snapshot(self, file_path):
+        """
+        Saves the build area and its height maps, so runs can be repeated without a game.
+
+        Parameters:
+        - file_path: The path of the .npz file to write
+        """
+        np.savez_compressed(
+            file_path,
+            offset=np.array(self.buildRect.offset),
+            size=np.array(self.buildRect.size),
+            **self.heightmaps,
+        )
+
+    def load_snapshot(self, file_path):
+        """
+        Loads the build area and height maps of a snapshot saved with save_snapshot.
+
+        Parameters:
+        - file_path: The path of the .npz file to read
+        """
+        with np.load(file_path) as snapshot:
+            self.buildRect = Rect(
+                ivec2(*snapshot["offset"].tolist()), ivec2(*snapshot["size"].tolist())
+            )
+            self.heightmaps = {
+                name: snapshot[name]
+                for name in ("MOTION_BLOCKING_NO_LEAVES", "OCEAN_FLOOR")
+            }
+
+    def load_shared(self, shared):
+        """
+        Uses the build area and height maps published in shared memory.
+
+        Parameters:
+        - shared: The SharedWorldView
+        """
+        self.buildRect = Rect(ivec2(*shared.offset), ivec2(*shared.size))
+        self.heightmaps = shared.heightmaps
+
+    def create_building(self, building_data, x_pos, z_pos, build=False, diff=False):
         """
         Packages building information.
 
@@ -66,27 +152,64 @@ class generateRandomSample:
         - x_pos: x position of the building
         - z_pos: z position of the building
         - build: if True the building will be placed in game
+        - diff: if True only the blocks that differ from the loaded world slice are placed
         """
-        # only take heigh of initial (0,0) of building and build off there
-        height = self.terrain_map[tuple(ivec2(x_pos, z_pos) - self.buildRect.offset)]
-        max_x, max_y, max_z = self.reader.get_data(building_data, "size")
+        max_x, max_y, max_z = self.building_size(building_data)
+
+        x_pos = min(self.per_max_x - max_x, x_pos)
+        z_pos = min(self.per_max_z - max_z, z_pos)
 
-        x_pos = min(self.per_max_x - max_x.value, x_pos)
-        z_pos = min(self.per_max_z - max_z.value, z_pos)
+        # only take height under the first block the building stands on and build off there
+        anchor_x, anchor_z = (int(cells[0]) for cells in self.footprint(building_data))
+        height = self.terrain_map[
+            tuple(ivec2(x_pos + anchor_x, z_pos + anchor_z) - self.buildRect.offset)
+        ]
 
-        xw = x_pos + max_x.value - 1
-        yh = height + max_y.value - 1
-        zd = z_pos + max_z.value - 1
+        xw = x_pos + max_x - 1
+        yh = height + max_y - 1
+        zd = z_pos + max_z - 1
 
         # append building name and location and dimensions to list
         position = Box.between(ivec3(x_pos, height, z_pos), ivec3(xw, yh, zd))
 
         if build:
             # self.add_flooring(x_pos, xw, z_pos, zd, height-1)
-            self.reader.create(building_data, ivec3(x_pos, height, z_pos))
+            if diff and self.worldSlice is not None:
+                placed, total = self.reader.create_diff(
+                    building_data, ivec3(x_pos, height, z_pos), self.worldSlice, self.editor
+                )
+                print(f"Placed {placed} of {total} blocks of {building_data}")
+            else:
+                self.reader.create(
+                    building_data, ivec3(x_pos, height, z_pos), self.host
+                )
 
         return str(building_data), position
 
+    def building_size(self, building_data):
+        """
+        Returns the size of a building, from the registered catalog or by reading its nbt file once.
+
+        Parameters:
+        - building_data: file path to the nbt file, or the name of a rotated or mirrored variant
+
+        Returns:
+        - A tuple with the x, y and z size of the building
+        """
+        return structure_size(building_data)
+
+    def footprint(self, building_data):
+        """
+        Returns the blocks a building stands on, the non-air blocks of its bottom layer.
+
+        Parameters:
+        - building_data: file path to the nbt file, or the name of a rotated or mirrored variant
+
+        Returns:
+        - A tuple of x and z offset arrays from the building position
+        """
+        return variant_footprint(building_data)
+
     def add_flooring(self, x0, x1, z0, z1, height):
         '''
         Creates a basic flooring.
@@ -125,23 +248,31 @@ class generateRandomSample:
         - 2D array height map of the entire build area
         - 2D array water map detailing which blocks are water or not
         """
-        height_map = self.worldSlice.heightmaps["MOTION_BLOCKING_NO_LEAVES"]
+        if self.shared is not None:
+            return self.shared.maps()
+
+        height_map = self.heightmaps["MOTION_BLOCKING_NO_LEAVES"]
         water_map = np.where(
-            self.worldSlice.heightmaps["MOTION_BLOCKING_NO_LEAVES"]
-            > self.worldSlice.heightmaps["OCEAN_FLOOR"],
+            self.heightmaps["MOTION_BLOCKING_NO_LEAVES"]
+            > self.heightmaps["OCEAN_FLOOR"],
             1,
             0,
         )
 
         return height_map, water_map
 
-    def evaluate_obj(self, current_building, placed_buildings):
+    def evaluate_obj(
+        self, current_building, placed_buildings, terrain_map=None, water_map=None, scale=1
+    ):
         """
         Evaluates the current building based its location and already placed buildings.
 
         Parameters:
         - current_building: The current building being evaluated
-        - placed_buildings: A list of buildings already placed
+        - placed_buildings: A SettlementState or a list of buildings already placed
+        - terrain_map: Optional downsampled height map to evaluate on instead of the full resolution map
+        - water_map: Optional downsampled water map, given together with terrain_map
+        - scale: The number of blocks per cell side of the given maps
 
         Returns:
         - The total score of the building 
@@ -150,14 +281,32 @@ class generateRandomSample:
         self.obj_func.set_params(
             current_building,
             placed_buildings,
-            self.terrain_map,
-            self.water_map,
+            self.terrain_map if terrain_map is None else terrain_map,
+            self.water_map if water_map is None else water_map,
             self.buildRect.begin[0],
             self.buildRect.begin[1],
+            scale,
+            self.footprint(current_building[0]),
         )
 
         return self.obj_func.total_fitness()
 
+    def score_settlement(self, buildings):
+        """
+        Scores every building of a settlement against all the other buildings in one pass.
+
+        Parameters:
+        - buildings: A list of (file path, Box) tuples
+
+        Returns:
+        - Dictionary of arrays with the individual, group, relation and total score and the sub-scores of every building
+        """
+        scorer = SettlementScorer(
+            self.terrain_map, self.water_map, self.buildRect.begin[0], self.buildRect.begin[1]
+        )
+
+        return scorer.score(buildings, [self.footprint(name) for name, _ in buildings])
+
 
 if __name__ == "__main__":
     sample = generateRandomSample()
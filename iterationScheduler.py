@@ -0,0 +1,181 @@
+import math
+import time
+
+
+class IterationScheduler:
+    def __init__(
+        self,
+        time_limit,
+        n_steps,
+        patience=0.3,
+        min_improvement=1e-3,
+        warmup=0.4,
+        min_steps=5,
+        tolerance=0.01,
+    ):
+        """
+        Spends the time budget of an optimization run over its searches.
+        The budget of every search is scaled to the remaining time and a search is stopped early once its best score stalls.
+
+        Parameters:
+        - time_limit: The time the run may take in seconds
+        - n_steps: The nominal number of evaluations of a search
+        - patience: Fraction of the guided search budget without improvement after which the search is stopped
+        - min_improvement: The smallest score increase counted as an improvement
+        - warmup: Fraction of the guided search budget that is always evaluated before stopping early
+        - min_steps: The smallest budget worth starting a search for
+        - tolerance: Fraction of the time limit that may be left unused at the end of the run
+        """
+        self.time_limit = time_limit
+        self.n_steps = n_steps
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.warmup = warmup
+        self.min_steps = min_steps
+        self.tolerance = tolerance
+
+        self.start_run()
+
+    def start_run(self):
+        """
+        Resets the scheduler at the start of a run.
+        """
+        self.run_start = time.time()
+        self.deadline = self.run_start + self.time_limit
+        self.eval_cost = None
+        self.total_evaluations = 0
+        self.searches = 0
+        self.early_stops = 0
+        self.saved_evaluations = 0
+        self.iterations = 0
+        self.budget = 0
+        self.exploration = 0
+        self.evaluations = 0
+        self.searches_left = 1
+
+    def remaining(self):
+        """
+        Returns:
+        - The time left in the run in seconds
+        """
+        return self.deadline - time.time()
+
+    def fitting_evaluations(self):
+        """
+        Returns:
+        - The number of evaluations that fit in the remaining time, based on the measured evaluation cost
+        """
+        if self.eval_cost is None:
+            return math.inf
+
+        return max(0, int(self.remaining() / self.eval_cost))
+
+    def can_start_iteration(self, searches):
+        """
+        Checks if another iteration fits in the remaining time.
+
+        Parameters:
+        - searches: The number of searches an iteration consists of
+
+        Returns:
+        - True if the iteration should be started, otherwise False
+        """
+        if self.remaining() <= self.tolerance * self.time_limit:
+            return False
+
+        if self.fitting_evaluations() < self.min_steps * searches:
+            return False
+
+        self.iterations += 1
+        self.searches_left = searches
+
+        return True
+
+    def start_search(self, nominal=None, exploration=0.0):
+        """
+        Starts a search and scales its budget to the remaining time.
+        Searches that begin with random sampling pass its share as exploration.
+        Stalls are only counted after it, and warmup and patience apply to the guided part of the budget.
+
+        Parameters:
+        - nominal: The number of evaluations the search would use without time pressure (default is n_steps)
+        - exploration: Fraction of the budget sampled at random before the search is guided (default is 0)
+
+        Returns:
+        - The number of evaluations the search may use, the first self.exploration of them for random sampling
+        """
+        nominal = self.n_steps if nominal is None else nominal
+        searches_left = max(1, self.searches_left)
+        share = self.fitting_evaluations() / searches_left
+
+        self.budget = int(max(1, min(nominal, share)))
+        self.exploration = max(1, int(exploration * self.budget)) if exploration > 0 else 0
+        self.nominal = nominal
+        self.evaluations = 0
+        self.best = -math.inf
+        self.since_improvement = 0
+        self.search_start = time.time()
+        self.searches += 1
+        self.searches_left = searches_left - 1
+
+        return self.budget
+
+    def record(self, scores):
+        """
+        Records the scores of finished evaluations.
+
+        Parameters:
+        - scores: A score or an iterable of scores
+        """
+        if not hasattr(scores, "__iter__"):
+            scores = [scores]
+
+        for score in scores:
+            self.evaluations += 1
+            self.total_evaluations += 1
+            if score > self.best + self.min_improvement:
+                self.best = score
+                self.since_improvement = 0
+            elif self.evaluations > self.exploration:
+                self.since_improvement += 1
+
+        # Running estimate of the cost of one evaluation
+        cost = (time.time() - self.search_start) / max(1, self.evaluations)
+        if self.eval_cost is None:
+            self.eval_cost = cost
+        else:
+            self.eval_cost = 0.8 * self.eval_cost + 0.2 * cost
+
+    def should_stop(self):
+        """
+        Checks if the current search should stop evaluating.
+
+        Returns:
+        - True if the budget is spent, the run is out of time or the best score stalled, otherwise False
+        """
+        if self.evaluations >= self.budget or time.time() >= self.deadline:
+            return True
+
+        guided = self.budget - self.exploration
+        stalled = (
+            self.evaluations >= self.exploration + self.warmup * guided
+            and self.since_improvement >= max(1, self.patience * guided)
+        )
+        if stalled:
+            self.early_stops += 1
+            self.saved_evaluations += self.budget - self.evaluations
+
+        return stalled
+
+    def report(self):
+        """
+        Prints how the time budget of the run was spent.
+        """
+        elapsed = time.time() - self.run_start
+        cost = 0 if self.eval_cost is None else self.eval_cost
+        print(
+            f"Used {elapsed:.1f}s of {self.time_limit}s over {self.iterations} iterations "
+            f"and {self.searches} searches\n"
+            f"Evaluations: {self.total_evaluations} ({cost * 1000:.1f}ms each), "
+            f"{self.early_stops} searches stopped early saving {self.saved_evaluations} evaluations"
+        )
@@ -0,0 +1,726 @@
+import argparse
+import ast
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from nbt import nbt
+from nbt_reader import AIR_BLOCKS, to_snbt
+from structureVariants import transform_properties, transform_xz
+
+MINECRAFT_VERSION = "1.20.2"
+Y_BEGIN = -64
+Y_SIZE = 384
+HEIGHTMAP_TYPES = (
+    "MOTION_BLOCKING",
+    "MOTION_BLOCKING_NO_LEAVES",
+    "OCEAN_FLOOR",
+    "WORLD_SURFACE",
+)
+
+# Palette indices of the natural terrain
+AIR, STONE, DIRT, GRASS, WATER, SAND = range(6)
+TERRAIN_PALETTE = (
+    ("minecraft:air", {}),
+    ("minecraft:stone", {}),
+    ("minecraft:dirt", {}),
+    ("minecraft:grass_block", {"snowy": "false"}),
+    ("minecraft:water", {"level": "0"}),
+    ("minecraft:sand", {}),
+)
+
+
+def pack_longs(values, bits):
+    """
+    Packs values into 64 bit longs like Minecraft does for block states and height maps (entries never span two longs).
+
+    Parameters:
+    - values: The unsigned values to pack
+    - bits: The number of bits per value
+
+    Returns:
+    - A list of signed 64 bit integers
+    """
+    per_long = 64 // bits
+    values = np.asarray(values, dtype=np.uint64)
+    values = np.pad(values, (0, -len(values) % per_long)).reshape(-1, per_long)
+    shifts = np.arange(per_long, dtype=np.uint64) * np.uint64(bits)
+
+    return np.bitwise_or.reduce(values << shifts, axis=1).view(np.int64).tolist()
+
+
+class MockWorld:
+
+    def __init__(self, offset, surface, floor):
+        """
+        In-memory world of a mock GDMC HTTP server.
+        The natural terrain is generated from two height maps, placed blocks are stored per chunk section on top of it.
+
+        Parameters:
+        - offset: The (x, z) coordinates of the first column of the height maps
+        - surface: Height map of the first free block above the terrain and water (MOTION_BLOCKING_NO_LEAVES)
+        - floor: Height map of the first free block above the terrain below water (OCEAN_FLOOR)
+        """
+        self.offset = np.array(offset, dtype=int)
+        self.surface = np.asarray(surface, dtype=int)
+        self.floor = np.asarray(floor, dtype=int)
+        self.size = np.array(self.surface.shape)
+
+        self.palette = list(TERRAIN_PALETTE)
+        self.palette_index = {
+            (name, json.dumps(properties, sort_keys=True)): index
+            for index, (name, properties) in enumerate(self.palette)
+        }
+        # (chunk x, section y, chunk z) -> {index in section: palette index}
+        self.sections = {}
+        self.block_data = {}
+        # (x, z) -> first free y above the placed blocks
+        self.tops = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def synthetic(cls, size=128, seed=0, offset=(0, 0), sea_level=62):
+        """
+        Creates a world of rolling hills with lakes below sea level.
+
+        Parameters:
+        - size: The width and depth of the build area
+        - seed: The random seed of the terrain
+        - offset: The (x, z) coordinates of the build area
+        - sea_level: The water level
+
+        Returns:
+        - The MockWorld
+        """
+        rng = np.random.default_rng(seed)
+        x, z = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+
+        height = np.full((size, size), 66.0)
+        for wavelength in (64, 32, 16):
+            angle = rng.uniform(0, 2 * np.pi)
+            phase = rng.uniform(0, 2 * np.pi)
+            direction = x * np.cos(angle) + z * np.sin(angle)
+            height += wavelength / 8 * np.sin(2 * np.pi * direction / wavelength + phase)
+
+        floor = np.round(height).astype(int)
+
+        return cls(offset, np.maximum(floor, sea_level), floor)
+
+    @classmethod
+    def from_snapshot(cls, file_path):
+        """
+        Creates a world from a snapshot saved with generateRandomSample.save_snapshot.
+
+        Parameters:
+        - file_path: The path of the .npz snapshot
+
+        Returns:
+        - The MockWorld
+        """
+        with np.load(file_path) as snapshot:
+            return cls(
+                snapshot["offset"],
+                snapshot["MOTION_BLOCKING_NO_LEAVES"],
+                snapshot["OCEAN_FLOOR"],
+            )
+
+    def build_area(self):
+        """
+        Returns:
+        - The build area in the format of the /buildarea endpoint
+        """
+        x_to, z_to = self.offset + self.size - 1
+        return {
+            "xFrom": int(self.offset[0]),
+            "yFrom": Y_BEGIN,
+            "zFrom": int(self.offset[1]),
+            "xTo": int(x_to),
+            "yTo": Y_BEGIN + Y_SIZE - 1,
+            "zTo": int(z_to),
+        }
+
+    def columns(self, x, z):
+        """
+        Looks up the natural terrain of columns, columns outside the height maps repeat the nearest edge.
+
+        Parameters:
+        - x: x coordinate(s) of the columns
+        - z: z coordinate(s) of the columns
+
+        Returns:
+        - A tuple (surface, floor) of heights
+        """
+        px = np.clip(np.asarray(x) - self.offset[0], 0, self.size[0] - 1)
+        pz = np.clip(np.asarray(z) - self.offset[1], 0, self.size[1] - 1)
+
+        return self.surface[px, pz], self.floor[px, pz]
+
+    @staticmethod
+    def terrain(y, surface, floor):
+        """
+        Parameters:
+        - y: y coordinate(s) of the blocks
+        - surface: The surface height of their column(s)
+        - floor: The floor height of their column(s)
+
+        Returns:
+        - The palette indices of the natural blocks
+        """
+        under_water = surface > floor
+        return np.select(
+            [
+                y >= surface,
+                y >= floor,
+                (y == floor - 1) & under_water,
+                y == floor - 1,
+                y >= floor - 4,
+            ],
+            [AIR, WATER, SAND, GRASS, DIRT],
+            STONE,
+        )
+
+    def state_index(self, name, properties):
+        """
+        Parameters:
+        - name: The block id
+        - properties: Dictionary of block states
+
+        Returns:
+        - The index of the block in the world palette, added when new
+        """
+        if ":" not in name:
+            name = f"minecraft:{name}"
+
+        key = (name, json.dumps(properties, sort_keys=True))
+        if key not in self.palette_index:
+            self.palette_index[key] = len(self.palette)
+            self.palette.append((name, dict(properties)))
+
+        return self.palette_index[key]
+
+    def set_block(self, x, y, z, name, properties=None, data=None):
+        """
+        Places a block, replacing the natural terrain or an earlier block.
+
+        Parameters:
+        - x: x coordinate of the block
+        - y: y coordinate of the block
+        - z: z coordinate of the block
+        - name: The block id
+        - properties: Dictionary of block states
+        - data: SNBT string of the block entity data
+        """
+        index = self.state_index(name, properties or {})
+        section = (x >> 4, y >> 4, z >> 4)
+        local = (y & 15) * 256 + (z & 15) * 16 + (x & 15)
+        self.sections.setdefault(section, {})[local] = index
+
+        if data is not None:
+            self.block_data[(x, y, z)] = data
+        else:
+            self.block_data.pop((x, y, z), None)
+
+        if self.palette[index][0] not in AIR_BLOCKS:
+            self.tops[(x, z)] = max(self.tops.get((x, z), Y_BEGIN), y + 1)
+
+    def get_block(self, x, y, z):
+        """
+        Parameters:
+        - x: x coordinate of the block
+        - y: y coordinate of the block
+        - z: z coordinate of the block
+
+        Returns:
+        - A tuple (block id, block states, SNBT data or None)
+        """
+        placed = self.sections.get((x >> 4, y >> 4, z >> 4), {})
+        local = (y & 15) * 256 + (z & 15) * 16 + (x & 15)
+        if local in placed:
+            index = placed[local]
+        else:
+            surface, floor = self.columns(x, z)
+            index = int(self.terrain(y, surface, floor))
+
+        name, properties = self.palette[index]
+
+        return name, properties, self.block_data.get((x, y, z))
+
+    def heightmap(self, kind, x, z):
+        """
+        Calculates a height map including the placed blocks.
+        Placed blocks raise every height map, leaves are not treated differently.
+
+        Parameters:
+        - kind: One of HEIGHTMAP_TYPES
+        - x: x coordinates of the columns
+        - z: z coordinates of the columns
+
+        Returns:
+        - The heights of the columns
+        """
+        surface, floor = self.columns(x, z)
+        heights = floor if kind == "OCEAN_FLOOR" else surface
+        tops = np.vectorize(lambda cx, cz: self.tops.get((cx, cz), Y_BEGIN), otypes=[int])
+
+        return np.maximum(heights, tops(x, z))
+
+    def section_tag(self, chunk_x, section_y, chunk_z):
+        """
+        Creates the NBT of a chunk section.
+
+        Parameters:
+        - chunk_x: x coordinate of the chunk
+        - section_y: y coordinate of the section
+        - chunk_z: z coordinate of the chunk
+
+        Returns:
+        - The TAG_Compound of the section
+        """
+        # Blocks are indexed y, z, x like Minecraft stores them
+        y, z, x = np.meshgrid(
+            section_y * 16 + np.arange(16),
+            chunk_z * 16 + np.arange(16),
+            chunk_x * 16 + np.arange(16),
+            indexing="ij",
+        )
+        surface, floor = self.columns(x, z)
+        states = self.terrain(y, surface, floor).ravel()
+
+        placed = self.sections.get((chunk_x, section_y, chunk_z))
+        if placed:
+            states[list(placed)] = list(placed.values())
+
+        indices, states = np.unique(states, return_inverse=True)
+
+        section = nbt.TAG_Compound(name="")
+        section.tags.append(nbt.TAG_Byte(name="Y", value=section_y))
+
+        block_states = nbt.TAG_Compound(name="block_states")
+        palette = nbt.TAG_List(name="palette", type=nbt.TAG_Compound)
+        for index in indices:
+            name, properties = self.palette[index]
+            entry = nbt.TAG_Compound()
+            entry.tags.append(nbt.TAG_String(name="Name", value=name))
+            if properties:
+                states_tag = nbt.TAG_Compound(name="Properties")
+                for key, value in properties.items():
+                    states_tag.tags.append(nbt.TAG_String(name=key, value=str(value)))
+                entry.tags.append(states_tag)
+            palette.tags.append(entry)
+        block_states.tags.append(palette)
+
+        if len(indices) > 1:
+            bits = max(4, int(np.ceil(np.log2(len(indices)))))
+            data = nbt.TAG_Long_Array(name="data")
+            data.value = pack_longs(states, bits)
+            block_states.tags.append(data)
+        section.tags.append(block_states)
+
+        biomes = nbt.TAG_Compound(name="biomes")
+        biome_palette = nbt.TAG_List(name="palette", type=nbt.TAG_String)
+        biome_palette.tags.append(nbt.TAG_String(value="minecraft:plains"))
+        biomes.tags.append(biome_palette)
+        section.tags.append(biomes)
+
+        return section
+
+    def chunk_tag(self, chunk_x, chunk_z):
+        """
+        Creates the NBT of a chunk, with height maps and sections but without block entities.
+
+        Parameters:
+        - chunk_x: x coordinate of the chunk
+        - chunk_z: z coordinate of the chunk
+
+        Returns:
+        - The TAG_Compound of the chunk
+        """
+        chunk = nbt.TAG_Compound()
+        chunk.tags.append(nbt.TAG_Int(name="xPos", value=chunk_x))
+        chunk.tags.append(nbt.TAG_Int(name="zPos", value=chunk_z))
+        chunk.tags.append(nbt.TAG_Int(name="yPos", value=Y_BEGIN // 16))
+        chunk.tags.append(nbt.TAG_String(name="Status", value="minecraft:full"))
+
+        # Height maps are indexed z, x and stored relative to the bottom of the world
+        z, x = np.meshgrid(
+            chunk_z * 16 + np.arange(16), chunk_x * 16 + np.arange(16), indexing="ij"
+        )
+        bits = max(1, int(np.ceil(np.log2(Y_SIZE))))
+        heightmaps = nbt.TAG_Compound(name="Heightmaps")
+        for kind in HEIGHTMAP_TYPES:
+            tag = nbt.TAG_Long_Array(name=kind)
+            tag.value = pack_longs((self.heightmap(kind, x, z) - Y_BEGIN).ravel(), bits)
+            heightmaps.tags.append(tag)
+        chunk.tags.append(heightmaps)
+
+        sections = nbt.TAG_List(name="sections", type=nbt.TAG_Compound)
+        for section_y in range(Y_BEGIN // 16, (Y_BEGIN + Y_SIZE) // 16):
+            sections.tags.append(self.section_tag(chunk_x, section_y, chunk_z))
+        chunk.tags.append(sections)
+
+        return chunk
+
+    def chunks(self, chunk_x, chunk_z, size_x=1, size_z=1):
+        """
+        Serializes chunks in the binary format of the /chunks endpoint.
+
+        Parameters:
+        - chunk_x: x coordinate of the first chunk
+        - chunk_z: z coordinate of the first chunk
+        - size_x: The number of chunks along x
+        - size_z: The number of chunks along z
+
+        Returns:
+        - The uncompressed NBT bytes
+        """
+        root = nbt.NBTFile()
+        root.name = ""
+        chunk_list = nbt.TAG_List(name="Chunks", type=nbt.TAG_Compound)
+        for dz in range(size_z):
+            for dx in range(size_x):
+                chunk_list.tags.append(self.chunk_tag(chunk_x + dx, chunk_z + dz))
+        root.tags.append(chunk_list)
+
+        buffer = BytesIO()
+        root.write_file(buffer=buffer)
+
+        return buffer.getvalue()
+
+    def place_structure(self, data, position, mirror=None, rotate=0, pivot=(0, 0, 0)):
+        """
+        Places a structure like the /structure endpoint: mirrored, then rotated clockwise around the pivot.
+
+        Parameters:
+        - data: The bytes of the structure file, gzipped or not
+        - position: The (x, y, z) position of the structure origin
+        - mirror: None, "x" or "z"
+        - rotate: The number of clockwise quarter turns
+        - pivot: The (x, y, z) pivot of the rotation relative to the origin
+
+        Returns:
+        - The number of placed blocks
+        """
+        if data[:2] == b"\x1f\x8b":
+            structure = nbt.NBTFile(fileobj=BytesIO(data))
+        else:
+            structure = nbt.NBTFile(buffer=BytesIO(data))
+
+        rotation = 90 * (rotate % 4)
+        mirrored = mirror is not None
+        if mirror == "z":
+            # Mirroring z is mirroring x followed by half a turn
+            rotation = (rotation + 180) % 360
+
+        palette_tag = structure["palette"] if "palette" in structure else structure["palettes"][0]
+        palette = []
+        for entry in palette_tag:
+            properties = (
+                {key: value.value for key, value in entry["Properties"].items()}
+                if "Properties" in entry
+                else {}
+            )
+            palette.append(
+                (entry["Name"].value, transform_properties(properties, rotation, mirrored))
+            )
+
+        blocks = structure["blocks"]
+        positions = np.array([[value.value for value in block["pos"]] for block in blocks])
+        x, z = transform_xz(
+            positions[:, 0] - pivot[0], positions[:, 2] - pivot[2], rotation, mirrored
+        )
+        x = x + pivot[0] + position[0]
+        y = positions[:, 1] + position[1]
+        z = z + pivot[2] + position[2]
+
+        for index, block in enumerate(blocks):
+            name, properties = palette[block["state"].value]
+            data = to_snbt(block["nbt"]) if "nbt" in block else None
+            self.set_block(int(x[index]), int(y[index]), int(z[index]), name, properties, data)
+
+        return len(blocks)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the mock GDMC HTTP server, serving the world of its server.
+    Every request waits for the latency of the server and every transfer is limited to its bandwidth.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def throttle(self, size):
+        """
+        Waits as long as transferring size bytes takes at the bandwidth of the server.
+        """
+        if self.server.bandwidth:
+            time.sleep(size / self.server.bandwidth)
+
+    def read_body(self):
+        """
+        Returns:
+        - The bytes of the request body
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.throttle(len(body))
+        self.server.record("bytes_in", len(body))
+
+        return body
+
+    def respond(self, body, content_type="application/json", status=200):
+        """
+        Sends a response, gzipped if the client accepts it.
+
+        Parameters:
+        - body: A JSON serializable object, str or bytes
+        - content_type: The content type of str and bytes bodies
+        - status: The HTTP status code
+        """
+        if isinstance(body, (bytes, str)):
+            body = body.encode() if isinstance(body, str) else body
+        else:
+            body = json.dumps(body).encode()
+            content_type = "application/json"
+
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 1024
+        if gzipped:
+            body = gzip.compress(body, compresslevel=1)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+
+        # Send in small pieces so the bandwidth limit also shapes the transfer
+        piece = max(1024, int(self.server.bandwidth or 0) // 20)
+        for start in range(0, len(body), piece):
+            self.wfile.write(body[start : start + piece])
+            self.throttle(len(body[start : start + piece]))
+        self.server.record("bytes_out", len(body))
+
+    def handle_request(self, method):
+        """
+        Routes a request to its endpoint.
+
+        Parameters:
+        - method: The HTTP method
+        """
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = (method, url.path.rstrip("/"))
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.record("requests", 1)
+
+        routes = {
+            ("GET", "/version"): self.get_version,
+            ("GET", "/buildarea"): self.get_build_area,
+            ("GET", "/chunks"): self.get_chunks,
+            ("GET", "/blocks"): self.get_blocks,
+            ("PUT", "/blocks"): self.put_blocks,
+            ("POST", "/structure"): self.post_structure,
+            ("GET", "/heightmap"): self.get_heightmap,
+        }
+        if route not in routes:
+            self.read_body()
+            self.respond({"message": f"No endpoint {method} {url.path}"}, status=404)
+            return
+
+        try:
+            routes[route](query)
+        except (KeyError, ValueError, SyntaxError) as error:
+            self.respond({"message": repr(error)}, status=400)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def get_version(self, query):
+        self.respond(MINECRAFT_VERSION, "text/plain")
+
+    def get_build_area(self, query):
+        self.respond(self.server.world.build_area())
+
+    def get_chunks(self, query):
+        x, z = int(query["x"]), int(query["z"])
+        dx, dz = int(query.get("dx", 1)), int(query.get("dz", 1))
+        with self.server.world.lock:
+            data = self.server.world.chunks(x, z, dx, dz)
+
+        self.respond(data, "application/octet-stream")
+
+    def get_blocks(self, query):
+        x, y, z = int(query["x"]), int(query["y"]), int(query["z"])
+        dx, dy, dz = (int(query.get(key, 1)) for key in ("dx", "dy", "dz"))
+        include_state = query.get("includeState", "false").lower() == "true"
+        include_data = query.get("includeData", "false").lower() == "true"
+
+        def span(start, size):
+            return range(start, start + size) if size >= 0 else range(start + size + 1, start + 1)
+
+        blocks = []
+        with self.server.world.lock:
+            for bx in span(x, dx):
+                for by in span(y, dy):
+                    for bz in span(z, dz):
+                        name, properties, data = self.server.world.get_block(bx, by, bz)
+                        block = {"x": bx, "y": by, "z": bz, "id": name}
+                        if include_state:
+                            block["state"] = properties
+                        if include_data:
+                            block["data"] = data or "{}"
+                        blocks.append(block)
+
+        self.respond(blocks)
+
+    def put_blocks(self, query):
+        body = self.read_body().decode()
+        try:
+            blocks = json.loads(body)
+        except json.JSONDecodeError:
+            # gdpc writes block data as Python string literals
+            blocks = ast.literal_eval(body)
+
+        # Block physics are not simulated, blocks sent with updates on are only counted
+        if query.get("doBlockUpdates", "true").lower() == "true":
+            self.server.record("updated_blocks", len(blocks))
+
+        with self.server.world.lock:
+            for block in blocks:
+                self.server.world.set_block(
+                    int(block["x"]),
+                    int(block["y"]),
+                    int(block["z"]),
+                    block["id"],
+                    block.get("state"),
+                    block.get("data"),
+                )
+
+        self.respond([{"status": 1} for _ in blocks])
+
+    def post_structure(self, query):
+        data = self.read_body()
+        position = tuple(int(query.get(key, 0)) for key in ("x", "y", "z"))
+        pivot = tuple(int(query.get(f"pivot{key}", 0)) for key in ("x", "y", "z"))
+
+        with self.server.world.lock:
+            self.server.world.place_structure(
+                data,
+                position,
+                mirror=query.get("mirror"),
+                rotate=int(query.get("rotate", 0)),
+                pivot=pivot,
+            )
+
+        self.respond({"status": 1})
+
+    def get_heightmap(self, query):
+        kind = query.get("type", "WORLD_SURFACE")
+        if kind not in HEIGHTMAP_TYPES:
+            raise ValueError(f"Unknown height map type {kind}")
+
+        world = self.server.world
+        x, z = np.meshgrid(
+            world.offset[0] + np.arange(world.size[0]),
+            world.offset[1] + np.arange(world.size[1]),
+            indexing="ij",
+        )
+        with world.lock:
+            heights = world.heightmap(kind, x, z)
+
+        self.respond(heights.tolist())
+
+
+class MockServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, world, host="localhost", port=9000, latency=0, bandwidth=None, verbose=False):
+        """
+        Local stand-in for Minecraft with the GDMC HTTP mod, for benchmarks and automated runs.
+        Requests are served concurrently, so pooled and parallel clients can be measured.
+
+        Parameters:
+        - world: The MockWorld to serve
+        - host: The host to listen on
+        - port: The port to listen on, 0 picks a free port
+        - latency: Seconds every request waits before it is handled
+        - bandwidth: Bytes per second of every transfer, None is unlimited
+        - verbose: If True every request is logged
+        """
+        super().__init__((host, port), MockHandler)
+        self.world = world
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.verbose = verbose
+        self.stats = {"requests": 0, "bytes_in": 0, "bytes_out": 0, "updated_blocks": 0}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        """
+        The address to pass as host to gdpc.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, key, value):
+        """
+        Adds a value to the transfer statistics.
+        """
+        with self.stats_lock:
+            self.stats[key] += value
+
+    def start(self):
+        """
+        Serves requests from a background thread.
+
+        Returns:
+        - The server itself
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mock GDMC HTTP server with synthetic or snapshot terrain."
+    )
+    parser.add_argument("--snapshot", help="World snapshot saved with batch.py --save-snapshot")
+    parser.add_argument("--size", type=int, default=128, help="Size of the synthetic build area")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic terrain")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every request")
+    parser.add_argument("--bandwidth", type=float, help="Transfer limit in bytes per second")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        world = MockWorld.from_snapshot(args.snapshot)
+    else:
+        world = MockWorld.synthetic(args.size, args.seed)
+
+    server = MockServer(
+        world, args.host, args.port, args.latency, args.bandwidth, args.verbose
+    )
+    print(f"Serving a {world.size[0]}x{world.size[1]} build area at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,7 +1,47 @@
-from nbt import nbt
+import json
+import numpy as np
 from glm import ivec3
-from gdpc import __url__, Block
-from gdpc.interface import placeStructure
+from structureVariants import AIR_BLOCKS, get_variant, parse_variant, variant_offset
+
+
+def to_snbt(tag):
+    """
+    Converts an NBT tag to its SNBT string, the format used for block data by the GDMC HTTP interface.
+
+    Parameters:
+    - tag: The NBT tag to convert.
+
+    Returns:
+    - The SNBT string of the tag.
+    """
+    from nbt import nbt
+
+    if isinstance(tag, nbt.TAG_Compound):
+        return (
+            "{"
+            + ",".join(f"{json.dumps(child.name)}:{to_snbt(child)}" for child in tag.tags)
+            + "}"
+        )
+    if isinstance(tag, nbt.TAG_List):
+        return "[" + ",".join(to_snbt(child) for child in tag.tags) + "]"
+    if isinstance(tag, nbt.TAG_String):
+        return json.dumps(tag.value, ensure_ascii=False)
+    if isinstance(tag, nbt.TAG_Byte_Array):
+        return "[B;" + ",".join(f"{value}b" for value in tag.value) + "]"
+    if isinstance(tag, nbt.TAG_Int_Array):
+        return "[I;" + ",".join(str(value) for value in tag.value) + "]"
+    if isinstance(tag, nbt.TAG_Long_Array):
+        return "[L;" + ",".join(f"{value}L" for value in tag.value) + "]"
+
+    suffixes = {
+        nbt.TAG_Byte: "b",
+        nbt.TAG_Short: "s",
+        nbt.TAG_Int: "",
+        nbt.TAG_Long: "L",
+        nbt.TAG_Float: "f",
+        nbt.TAG_Double: "d",
+    }
+    return f"{tag.value}{suffixes[type(tag)]}"
 
 
 class nbt_reader:
@@ -26,6 +66,8 @@ class nbt_reader:
         Returns:
         - The block data from the palette.
         """
+        from nbt import nbt
+
         palette = nbt.NBTFile(file_path)["palette"]
         return palette[block["state"].value]
 
@@ -40,6 +82,9 @@ class nbt_reader:
         Returns:
         - The Block object at the specified position, or None if not found.
         """
+        from nbt import nbt
+        from gdpc import Block
+
         blocks = nbt.NBTFile(file_path)["blocks"]
         for current_block in blocks:
             x, y, z = current_block["pos"]
@@ -64,6 +109,8 @@ class nbt_reader:
         Raises:
         - ValueError: If an invalid data_type is provided.
         """
+        from nbt import nbt
+
         if data_type not in {"size", "entities", "blocks", "palette"}:
             raise ValueError(
                 "Invalid data_type. Allowed values are 'size', 'entities', 'blocks', 'palette'"
@@ -72,16 +119,145 @@ class nbt_reader:
         nbt_file = nbt.NBTFile(file_path)
         return nbt_file[data_type]
 
-    def create(self, file_path, pos: ivec3):
+    def get_voxels(self, file_path):
+        """
+        Reads the blocks of an NBT file into arrays.
+
+        Parameters:
+        - file_path: The path to the NBT file containing the blocks.
+
+        Returns:
+        - A tuple containing:
+            - The size (x, y, z) of the structure.
+            - An (n, 3) array with the position of every block.
+            - An array with the palette index of every block.
+            - The palette as a list of (name, properties) tuples.
+            - A dictionary from block index to the SNBT data of its block entity.
+        """
+        from nbt import nbt
+
+        data = nbt.NBTFile(file_path)
+        blocks = data["blocks"]
+
+        size = tuple(value.value for value in data["size"])
+        positions = np.array(
+            [[value.value for value in block["pos"]] for block in blocks], dtype=np.int32
+        ).reshape(-1, 3)
+        states = np.array([block["state"].value for block in blocks], dtype=np.int32)
+        palette = [
+            (
+                entry["Name"].value,
+                (
+                    {key: value.value for key, value in entry["Properties"].items()}
+                    if "Properties" in entry
+                    else {}
+                ),
+            )
+            for entry in data["palette"]
+        ]
+        block_data = {
+            index: to_snbt(block["nbt"])
+            for index, block in enumerate(blocks)
+            if "nbt" in block
+        }
+
+        return size, positions, states, palette, block_data
+
+    def create(self, file_path, pos: ivec3, host=None):
         """
         Creates a structure based on data from an NBT file at a specified position.
+        Rotated and mirrored variants are transformed by the server and shifted so they start at the position.
 
         Parameters:
-        - file_path: The path to the NBT file containing structure data.
+        - file_path: The path to the NBT file containing structure data, or the name of a variant.
         - pos: The position (ivec3) where the structure should be placed.
+        - host: The address of the GDMC HTTP interface, the gdpc default if None.
         """
+        from nbt import nbt
+        from gdpc.interface import DEFAULT_HOST, placeStructure
+
+        host = host or DEFAULT_HOST
+
+        file_path, rotation, mirror = parse_variant(file_path)
         data = nbt.NBTFile(file_path)
-        placeStructure(structureData=data, position=pos)
+
+        if rotation == 0 and not mirror:
+            placeStructure(structureData=data, position=pos, host=host)
+            return
+
+        size = [value.value for value in data["size"]]
+        offset_x, offset_z = variant_offset(size, rotation, mirror)
+        placeStructure(
+            structureData=data,
+            position=pos - ivec3(offset_x, 0, offset_z),
+            mirror=(mirror, False),
+            rotate=rotation // 90,
+            host=host,
+        )
+
+    def create_diff(self, file_path, pos: ivec3, world_slice, editor):
+        """
+        Creates a structure by only placing the blocks that differ from the world.
+        The blocks of the structure are compared with the cached world slice and the differing ones are sent in batches.
+        Blocks with block entity data are always sent, entities of the structure are not placed.
+        Like placeStructure the blocks are placed without block updates or drops, so sand, doors, torches
+        and water do not fall or break when they arrive before their support or other half.
+
+        Parameters:
+        - file_path: The path to the NBT file containing structure data, or the name of a variant.
+        - pos: The position (ivec3) where the structure should be placed.
+        - world_slice: The WorldSlice the blocks are compared with.
+        - editor: The Editor used to place the blocks.
+
+        Returns:
+        - A tuple with the number of placed blocks and the number of blocks in the structure.
+        """
+        from gdpc import Block
+        from gdpc.interface import placeBlocks
+
+        variant = get_variant(file_path)
+        origin = np.array([pos.x, pos.y, pos.z])
+
+        changed = {}
+        for index, (position, state) in enumerate(
+            zip(variant.positions + origin, variant.states)
+        ):
+            name, properties = variant.palette[state]
+            data = variant.block_data.get(index)
+
+            if data is None:
+                current = world_slice.getBlockGlobal(ivec3(*position))
+                if name in AIR_BLOCKS and current.id in AIR_BLOCKS:
+                    continue
+                if current.id == name and dict(current.states) == properties:
+                    continue
+
+            changed.setdefault((state, data), []).append(ivec3(*position))
+
+        # gdpc 7.3 flushes the editor buffer with block updates regardless of editor.doBlockUpdates,
+        # so the batches are sent directly with updates and drops disabled
+        blocks = [
+            (position, Block(*variant.palette[state], data))
+            for (state, data), positions in changed.items()
+            for position in positions
+        ]
+        for start in range(0, len(blocks), editor.bufferLimit):
+            response = placeBlocks(
+                blocks[start : start + editor.bufferLimit],
+                dimension=editor.dimension,
+                doBlockUpdates=False,
+                spawnDrops=False,
+                retries=editor.retries,
+                timeout=editor.timeout,
+                host=editor.host,
+            )
+            for success, result in response:
+                if not success:
+                    print(f"Placing a block of {file_path} failed: {result}")
+
+        placed = sum(len(positions) for positions in changed.values())
+
+        return placed, len(variant.states)
 
 
 if __name__ == "__main__":
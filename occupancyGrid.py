@@ -0,0 +1,150 @@
+import numpy as np
+
+
+class OccupancyGrid:
+
+    def __init__(self, offset_x, offset_z, size_x, size_z):
+        """
+        Rasterized occupancy of the build area, updated on every placement.
+        Like Box.collides, footprints that touch a placed building collide, only the y axis is ignored.
+
+        Parameters:
+        - offset_x: The x coordinate of the first column of the build area
+        - offset_z: The z coordinate of the first row of the build area
+        - size_x: The width of the build area
+        - size_z: The depth of the build area
+        """
+        self.offx = offset_x
+        self.offz = offset_z
+        self.grid = np.zeros((size_x, size_z), dtype=bool)
+        self.version = 0
+
+        self.table = None
+        self.masks = {}
+
+    def add(self, box):
+        """
+        Marks the (x, z) footprint of a placed building as occupied.
+
+        Parameters:
+        - box: The Box of the placed building
+        """
+        x0, _, z0 = box.begin
+        x1, _, z1 = box.end
+        x0, x1 = max(0, x0 - self.offx), max(0, x1 - self.offx)
+        z0, z1 = max(0, z0 - self.offz), max(0, z1 - self.offz)
+
+        self.grid[x0:x1, z0:z1] = True
+        self.version += 1
+        self.table = None
+        self.masks.clear()
+
+    def summed_area(self):
+        """
+        Returns:
+        - The summed-area table of the grid, padded with a leading row and column of zeros
+        """
+        if self.table is None:
+            self.table = np.zeros(
+                (self.grid.shape[0] + 1, self.grid.shape[1] + 1), dtype=np.int32
+            )
+            self.table[1:, 1:] = self.grid.cumsum(axis=0).cumsum(axis=1)
+
+        return self.table
+
+    def window_sums(self, x0, x1, z0, z1):
+        """
+        Counts the occupied cells in windows of the grid.
+
+        Parameters:
+        - x0, x1: Arrays with the first and one-past-last column of each window
+        - z0, z1: Arrays with the first and one-past-last row of each window
+
+        Returns:
+        - The number of occupied cells of every window, broadcast over the inputs
+        """
+        width, depth = self.grid.shape
+        x0, x1 = np.clip(x0, 0, width), np.clip(x1, 0, width)
+        z0, z1 = np.clip(z0, 0, depth), np.clip(z1, 0, depth)
+        table = self.summed_area()
+
+        return table[x1, z1] - table[x0, z1] - table[x1, z0] + table[x0, z0]
+
+    def collision_mask(self, size_x, size_z, buffer=0):
+        """
+        Computes for every anchor of the grid if a footprint placed there would collide.
+        The footprint is dilated by one block, so touching footprints collide, and by the buffer on top of that.
+
+        Parameters:
+        - size_x: The width of the footprint
+        - size_z: The depth of the footprint
+        - buffer: The number of free blocks to keep from placed buildings beyond the one touching rule (default is 0)
+
+        Returns:
+        - A boolean array of the grid shape, True where the anchor would collide
+        """
+        key = (size_x, size_z, buffer)
+        if key not in self.masks:
+            anchors_x = np.arange(self.grid.shape[0])[:, None]
+            anchors_z = np.arange(self.grid.shape[1])[None, :]
+            reach = buffer + 1
+
+            self.masks[key] = (
+                self.window_sums(
+                    anchors_x - reach,
+                    anchors_x + size_x + reach,
+                    anchors_z - reach,
+                    anchors_z + size_z + reach,
+                )
+                > 0
+            )
+
+        return self.masks[key]
+
+    def collides(self, x, z, size_x, size_z, buffer=0):
+        """
+        Checks if footprints anchored at the given coordinates collide with a placed building.
+
+        Parameters:
+        - x: The x coordinate(s) of the anchors
+        - z: The z coordinate(s) of the anchors
+        - size_x: The width of the footprint
+        - size_z: The depth of the footprint
+        - buffer: The number of free blocks to keep from placed buildings beyond the one touching rule (default is 0)
+
+        Returns:
+        - True where the footprint collides, as a bool or boolean array matching the inputs
+        """
+        px = np.asarray(x) - self.offx
+        pz = np.asarray(z) - self.offz
+        inside = (
+            (px >= 0) & (px < self.grid.shape[0]) & (pz >= 0) & (pz < self.grid.shape[1])
+        )
+
+        # Bulk queries read the precomputed mask, single anchors or anchors outside the grid use one window lookup
+        if np.ndim(px) > 0 and np.all(inside):
+            return self.collision_mask(size_x, size_z, buffer)[px, pz]
+
+        reach = buffer + 1
+        return (
+            self.window_sums(
+                px - reach, px + size_x + reach, pz - reach, pz + size_z + reach
+            )
+            > 0
+        )
+
+    def collides_box(self, box, buffer=0):
+        """
+        Checks if a building collides with a placed building.
+
+        Parameters:
+        - box: The Box of the building
+        - buffer: The number of free blocks to keep from placed buildings beyond the one touching rule (default is 0)
+
+        Returns:
+        - True if the footprint of the building collides, otherwise False
+        """
+        x0, _, z0 = box.begin
+        x1, _, z1 = box.end
+
+        return bool(self.collides(x0, z0, x1 - x0, z1 - z0, buffer))
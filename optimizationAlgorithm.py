@@ -1,12 +1,264 @@
-import os
-import time
-from bayes_opt import BayesianOptimization
 import numpy as np
 from buildingHandler import generateRandomSample
+from buildingCatalog import load_catalog, register_catalogs
+from iterationScheduler import IterationScheduler
+from occupancyGrid import OccupancyGrid
+from resultCache import ResultCache, catalog_hash, world_hash
+from settlementState import SettlementState
+from sharedWorld import SharedWorld, SharedWorldView
+from terrainPyramid import TerrainPyramid
+from traceLog import TraceWriter
+
+
+class SearchEngine:
+    def __init__(self, optimizer, seed=0):
+        """
+        Base class of the search strategies used by BayesOpts.
+        An engine proposes candidates, scores them with the optimizer and returns the top k as BuildingNodes.
+
+        Parameters:
+        - optimizer: The BayesOpts instance providing the objective and settings,
+          None for engines passed to BayesOpts, which binds them to itself
+        - seed: The random seed of the first iteration, incremented on every iteration
+        """
+        self.optimizer = optimizer
+        self.seed = seed
+
+    def settings(self):
+        """
+        Returns:
+        - Dictionary of the engine type and every setting that changes its results, part of the cache key
+        """
+        return {"type": type(self).__name__, "seed": self.seed}
+
+    def top_candidates(self, bounds, k):
+        """
+        Performs one iteration of the search.
+
+        Parameters:
+        - bounds: The map bounds for the optimization
+        - k: The number of candidates to return
+
+        Returns:
+        - The top k buildings from the iteration as BuildingNodes
+        """
+        raise NotImplementedError
+
+    def to_nodes(self, scored, k):
+        """
+        Converts scored candidates to the top k BuildingNodes.
+
+        Parameters:
+        - scored: List of (score, params) tuples
+        - k: The number of candidates to return
+
+        Returns:
+        - The top k candidates as BuildingNodes, best first
+        """
+        output = []
+        for score, params in sorted(scored, key=lambda x: x[0], reverse=True)[:k]:
+            result_node = BayesOpts.BuildingNode()
+            result_node.score = score
+            result_node.params = params
+
+            output.append(result_node)
+
+        return output
+
+
+class BayesianEngine(SearchEngine):
+    def top_candidates(self, bounds, k):
+        """
+        Performs an iteration of Bayesian optimization.
+        The first 40% of the budget is sampled at random and scored in one batch, which the workers share.
+        The rest is suggested by the acquisition function one evaluation at a time, as every suggestion depends on the previous score.
+
+        Parameters:
+        - bounds: The map bounds for the optimization
+        - k: The number of candidates to return
+
+        Returns:
+        - The top k buildings from the optimization based on target score
+        """
+        # scikit-learn and scipy are only loaded by runs that use this engine
+        from bayes_opt import BayesianOptimization, UtilityFunction
+
+        scheduler = self.optimizer.scheduler
+        scheduler.start_search(exploration=0.4)
+        init_points = scheduler.exploration
+
+        optimizer = BayesianOptimization(
+            f=None,
+            pbounds=bounds,
+            random_state=self.seed,
+            allow_duplicate_points=True,
+        )
+        utility = UtilityFunction(kind="ucb", kappa=2.576, xi=0.0)
+        rng = np.random.RandomState(self.seed)
+        self.seed += 1
+
+        scored = []
+        if not scheduler.should_stop():
+            samples = [
+                {key: rng.uniform(*bounds[key]) for key in bounds} for _ in range(init_points)
+            ]
+            scores = self.optimizer.test_building_batch(
+                {key: np.array([params[key] for params in samples]) for key in bounds}
+            )
+            for params, score in zip(samples, scores):
+                optimizer.register(params=params, target=score)
+                scored.append((score, params))
+            scheduler.record(scores)
+
+        while not scheduler.should_stop():
+            params = optimizer.suggest(utility)
+            score = self.optimizer.test_building_loc(**params)
+            optimizer.register(params=params, target=score)
+            scheduler.record(score)
+            scored.append((score, params))
+
+        return self.to_nodes(scored, k)
+
+
+class EvolutionaryEngine(SearchEngine):
+    def __init__(
+        self,
+        optimizer,
+        seed=0,
+        population_size=32,
+        generations=8,
+        elite=4,
+        mutation_rate=0.3,
+    ):
+        """
+        Genetic algorithm over (x, z, building_id).
+        The new candidates of each generation are scored in one batched call to the optimizer,
+        candidates carried over unchanged from an earlier generation keep their score.
+        The budget of population_size * generations evaluations is scaled by the optimizer's scheduler.
+
+        Parameters:
+        - optimizer: The BayesOpts instance providing the objective and settings
+        - seed: The random seed of the first iteration
+        - population_size: Number of candidates scored per generation
+        - generations: Nominal number of generations per iteration
+        - elite: Number of best candidates carried over unchanged to the next generation
+        - mutation_rate: Probability of mutating each gene of a child
+        """
+        super().__init__(optimizer, seed)
+        self.population_size = population_size
+        self.generations = generations
+        self.elite = min(elite, population_size)
+        self.mutation_rate = mutation_rate
+
+    def settings(self):
+        """
+        Returns:
+        - Dictionary of the engine type and every setting that changes its results, part of the cache key
+        """
+        return {
+            **super().settings(),
+            "population_size": self.population_size,
+            "generations": self.generations,
+            "elite": self.elite,
+            "mutation_rate": self.mutation_rate,
+        }
+
+    def top_candidates(self, bounds, k):
+        """
+        Performs an iteration of the genetic algorithm.
+
+        Parameters:
+        - bounds: The map bounds for the optimization
+        - k: The number of candidates to return
+
+        Returns:
+        - The top k buildings found over all generations
+        """
+        rng = np.random.default_rng(self.seed)
+        self.seed += 1
+
+        keys = list(bounds.keys())
+        low = np.array([bounds[key][0] for key in keys], dtype=float)
+        high = np.array([bounds[key][1] for key in keys], dtype=float)
+        sigma = 0.1 * (high - low)
+
+        scheduler = self.optimizer.scheduler
+        scheduler.start_search(self.population_size * self.generations)
+
+        population = rng.uniform(low, high, size=(self.population_size, len(keys)))
+        evaluated = {}
+
+        while not scheduler.should_stop():
+            # The elite and unchanged children were scored on the same settlement state already
+            known = np.array([tuple(row) in evaluated for row in population], dtype=bool)
+            fresh = population[~known][: scheduler.budget - scheduler.evaluations]
+            population = np.vstack([population[known], fresh])
+
+            if len(fresh):
+                fresh_scores = self.optimizer.test_building_batch(
+                    {key: fresh[:, i] for i, key in enumerate(keys)}
+                )
+                scheduler.record(fresh_scores)
+                for row, score in zip(fresh, fresh_scores):
+                    evaluated[tuple(row)] = score
+            scores = np.array([evaluated[tuple(row)] for row in population])
+
+            order = np.argsort(scores)[::-1]
+            parents = population[order]
+            parent_scores = scores[order]
+
+            # Tournament selection between random pairs of the population
+            elite = min(self.elite, len(parents))
+            n_children = self.population_size - elite
+            first = rng.integers(0, len(parents), size=(n_children, 2))
+            second = rng.integers(0, len(parents), size=(n_children, 2))
+            pick_a = np.where(
+                parent_scores[first[:, 0]] >= parent_scores[first[:, 1]],
+                first[:, 0],
+                first[:, 1],
+            )
+            pick_b = np.where(
+                parent_scores[second[:, 0]] >= parent_scores[second[:, 1]],
+                second[:, 0],
+                second[:, 1],
+            )
+
+            # Uniform crossover followed by gaussian mutation, clipped to the bounds
+            crossover = rng.random((n_children, len(keys))) < 0.5
+            children = np.where(crossover, parents[pick_a], parents[pick_b])
+            mutate = rng.random((n_children, len(keys))) < self.mutation_rate
+            children = children + mutate * rng.normal(0, sigma, size=children.shape)
+            children = np.clip(children, low, high)
+
+            population = np.vstack([parents[:elite], children])
+
+        scored = [
+            (score, dict(zip(keys, row))) for row, score in evaluated.items()
+        ]
+
+        return self.to_nodes(scored, k)
 
 
 class BayesOpts:
-    def __init__(self, time=600, threshold=0.5, depth=1, n_steps=40):
+    engines = {"bayes": BayesianEngine, "evolutionary": EvolutionaryEngine}
+
+    def __init__(
+        self,
+        time=600,
+        threshold=0.5,
+        depth=1,
+        n_steps=40,
+        engine="bayes",
+        seed=0,
+        min_spacing=0,
+        dataset="normal",
+        generator=None,
+        variants=False,
+        cache=True,
+        coarse_levels=0,
+        trace=None,
+        workers=0,
+    ):
         """
         Initializes Bayesian Optimization Algorithm
 
@@ -15,23 +267,93 @@ class BayesOpts:
         - Threshold: A rejection threshold. Buildings with a score less than the threshold will not be built. 
         - Depth: The search depth to consider when evaluating a building. Depth of 1 means no search.
         - n_steps: Number of steps to complete on each iteration of Bayesian Optimization 
+        - engine: The search engine, either a key of BayesOpts.engines or a SearchEngine instance
+        - seed: The random seed of the first iteration
+        - min_spacing: Free blocks to keep between buildings on top of the one block gap Box.collides requires. 0 keeps that gap.
+        - dataset: The folder in nbtData with the buildings to place
+        - generator: A generateRandomSample to use, one connected to the game is created when not given
+        - variants: If True rotated and mirrored buildings are part of the search space
+        - cache: If True results and evaluation scores are cached across runs with the same world, catalog, parameters and seed
+        - coarse_levels: If larger than 0 every search first runs on terrain downsampled 2^coarse_levels times and then refines the best candidates at full resolution
+        - trace: Optional folder to write a trace of every evaluation to, see traceLog.load_trace
+        - workers: If larger than 0 batched evaluations are spread over this many processes sharing the world data.
+          These are the generations of the evolutionary engine, the random samples of the Bayesian engine and the refinement after a coarse search.
         """
-        self.generator = generateRandomSample()
-        self.seed = 0
+        self.generator = generator if generator is not None else generateRandomSample()
+
+        if isinstance(engine, SearchEngine):
+            self.engine = engine
+            self.engine.optimizer = self
+        else:
+            self.engine = self.engines[engine](self, seed)
 
         self.threshold = threshold
         self.depth = depth
         self.n_iterations = n_steps
 
         self.time = time
+        self.scheduler = IterationScheduler(time, n_steps)
+
+        self.min_spacing = min_spacing
+        rect = self.generator.buildRect
+        self.building_locations = SettlementState(
+            grid=OccupancyGrid(rect.begin[0], rect.begin[1], rect.size[0], rect.size[1])
+        )
+        self.catalog = load_catalog(dataset, variants)
+        self.dataset = self.catalog.paths
+        self.footprint_sizes = self.catalog.footprint_sizes()
+
+        parameters = {
+            "time": time,
+            "threshold": threshold,
+            "depth": depth,
+            "n_steps": n_steps,
+            "engine": engine if isinstance(engine, str) else self.engine.settings(),
+            "min_spacing": min_spacing,
+            "dataset": dataset,
+            "variants": variants,
+            "coarse_levels": coarse_levels,
+        }
+
+        self.cache = None
+        if cache:
+            self.cache = ResultCache(
+                world_hash(self.generator), catalog_hash(self.catalog), parameters, seed
+            )
 
-        self.building_locations = []
-        self.dataset = self.list_nbt_files("normal")
         self.terrain_map, self.water_map = self.generator.map_area()
         self.per_min_x, self.per_max_x, self.per_min_z, self.per_max_z = (
             self.generator.perimeter_min_max()
         )
 
+        self.coarse_levels = coarse_levels
+        if self.generator.shared is not None:
+            self.pyramid = self.generator.shared.pyramid(coarse_levels)
+        else:
+            self.pyramid = TerrainPyramid(self.terrain_map, self.water_map, coarse_levels)
+        self.level = 0
+        self.coarse_scores = {}
+        self.coarse_signature = None
+
+        self.trace = None
+        if trace is not None:
+            self.trace = TraceWriter(
+                trace, {"parameters": parameters, "seed": seed, "buildings": self.dataset}
+            )
+        self.iteration = 0
+        self.current_depth = 1
+        self.evaluation = {}
+
+        self.workers = workers
+        self.worker_settings = {
+            "dataset": dataset,
+            "variants": variants,
+            "min_spacing": min_spacing,
+            "coarse_levels": coarse_levels,
+        }
+        self.shared = None
+        self.pool = None
+
     class BuildingNode:
         def __init__(self):
             """
@@ -53,6 +375,12 @@ class BayesOpts:
         - List containing the outputs of each iteration of Bayesian Optimization
         """
 
+        if self.cache is not None:
+            cached = self.cache.load_results()
+            if cached is not None:
+                print("Loaded cached results")
+                return self.restore_results(cached)
+
         print("Start Optimization")
         results = []
         building_list = len(self.dataset)
@@ -62,30 +390,107 @@ class BayesOpts:
             "building_id": (0, building_list - 1),
         }
 
-        start_time = time.time()
-        iteration_end = 0
-        while True:
-            iteration_start = time.time()
-            elapsed_time = iteration_start - start_time
+        # Every iteration runs one search plus depth^i searches for each level of the depth search
+        searches = sum(self.depth**i for i in range(self.depth))
+        if self.coarse_levels > 0:
+            # Each search is split in a coarse and a refining stage
+            searches *= 2
+
+        self.start_workers()
+        self.scheduler.start_run()
+        self.iteration = 0
+        try:
+            while self.scheduler.can_start_iteration(searches):
+                self.current_depth = 1
+                starting_building = self.top_optimized_candidates(bounds)
+                if not starting_building:
+                    break
+
+                best_start = self.get_highest_score(starting_building)
+                if best_start.score > self.threshold:
+                    outputs = self.depth_search_optimization(starting_building, bounds)
+                    best_out = self.get_highest_score(outputs)
+                    x, z, id = self.node2building(best_out)
+                    best_building = self.generator.create_building(id, x, z)
+                    self.place_building(best_building)
+                    results.append(best_out)
+                self.iteration += 1
+        finally:
+            self.stop_workers()
+            if self.trace is not None:
+                self.trace.close()
+
+        print("Time limit reached")
+        self.scheduler.report()
+
+        if self.cache is not None:
+            self.cache.save_results(results)
 
-            if elapsed_time >= self.time - iteration_end:
-                print("Time limit reached")
-                break
+        return results
 
-            starting_building = self.top_optimized_candidates(bounds)
-            best_start = self.get_highest_score(starting_building)
-            if best_start.score > self.threshold:
-                outputs = self.depth_search_optimization(starting_building, bounds)
-                best_out = self.get_highest_score(outputs)
-                x, z, id = self.node2building(best_out)
-                best_building = self.generator.create_building(id, x, z)
-                self.building_locations.append(best_building)
-                results.append(best_out)
+    def restore_results(self, cached):
+        """
+        Rebuilds the results of a cached run and places them in the settlement state.
+
+        Parameters:
+        - cached: A list of (score, params) results
+
+        Returns:
+        - List of BuildingNodes of the cached run
+        """
+        results = []
+        for score, params in cached:
+            node = self.BuildingNode()
+            node.score = score
+            node.params = params
 
-            iteration_end = time.time() - iteration_start
+            x, z, id = self.node2building(node)
+            self.place_building(self.generator.create_building(id, x, z))
+            results.append(node)
 
         return results
 
+    def place_building(self, building):
+        """
+        Adds a building to the settlement state and publishes it to the workers.
+
+        Parameters:
+        - building: A (file path, Box) tuple
+        """
+        self.building_locations.add(building)
+        if self.shared is not None:
+            self.shared.add(self.dataset.index(str(building[0])), building[1])
+
+    def start_workers(self):
+        """
+        Publishes the world data and placed buildings in shared memory and starts the worker processes.
+        """
+        if self.workers <= 0:
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.shared = SharedWorld(self.generator, self.coarse_levels)
+        for name, box in self.building_locations:
+            self.shared.add(self.dataset.index(str(name)), box)
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_evaluator,
+            initargs=(self.shared.descriptor, self.catalog, self.worker_settings),
+        )
+
+    def stop_workers(self):
+        """
+        Stops the worker processes and releases the shared memory.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
     def get_highest_score(self, candidates):
         """
         Starts the optimization algorithm with the parameters from initialization.
@@ -136,6 +541,7 @@ class BayesOpts:
 
         # Call top_optimized_candidates on children and collect results
         results = []
+        self.current_depth = current_depth + 1
         for child in candidates:
             if child.children is None:
                 child_results = self.top_optimized_candidates(
@@ -152,7 +558,7 @@ class BayesOpts:
 
     def top_optimized_candidates(self, bounds):
         """
-        Performs an iteration of Bayesian optimization.
+        Performs an iteration of the search engine.
 
         Parameters:
         - bounds: The map bounds for the optimization
@@ -160,31 +566,58 @@ class BayesOpts:
         Returns:
         - The top N buildings from the optimization based on target score
         """
+        if self.coarse_levels == 0:
+            return self.engine.top_candidates(bounds, self.depth)
 
-        output = []
-        optimizer = BayesianOptimization(
-            f=self.test_building_loc, pbounds=bounds, random_state=self.seed
-        )
+        self.level = self.coarse_levels
+        try:
+            coarse = self.engine.top_candidates(bounds, 2 * self.depth)
+        finally:
+            self.level = 0
 
-        optimizer.maximize(
-            n_iter=int(0.6 * self.n_iterations),
-            init_points=int(0.4 * self.n_iterations),
-        )
+        return self.refine_candidates(coarse, bounds)
 
-        self.seed += 1
-        sorted_fitness = sorted(optimizer.res, key=lambda x: x["target"], reverse=True)
-        top_scores = [
-            (entry["target"], entry["params"]) for entry in sorted_fitness[: self.depth]
-        ]
+    def refine_candidates(self, candidates, bounds):
+        """
+        Searches the full resolution neighbourhood of candidates found on coarse terrain.
+        The window around every candidate spans one coarse cell in each direction.
 
-        for result in top_scores:
-            result_node = self.BuildingNode()
-            result_node.score = result[0]
-            result_node.params = result[1]
+        Parameters:
+        - candidates: BuildingNodes from the coarse search, best first
+        - bounds: The map bounds for the optimization
 
-            output.append(result_node)
+        Returns:
+        - The top N buildings of the refined candidates based on target score
+        """
+        factor = 2**self.coarse_levels
+        offsets = np.arange(-factor, factor + 1, max(1, factor // 2))
+        offset_x, offset_z = (grid.ravel() for grid in np.meshgrid(offsets, offsets))
+
+        xs, zs, ids = [], [], []
+        for node in candidates:
+            xs.append(node.params["x"] + offset_x)
+            zs.append(node.params["z"] + offset_z)
+            ids.append(np.full(len(offset_x), node.params["building_id"]))
+
+        if not xs:
+            return []
+
+        # Best candidates come first, so a reduced budget refines those
+        budget = self.scheduler.start_search(len(offset_x) * len(candidates))
+        refined = {
+            "x": np.clip(np.concatenate(xs), *bounds["x"])[:budget],
+            "z": np.clip(np.concatenate(zs), *bounds["z"])[:budget],
+            "building_id": np.concatenate(ids)[:budget],
+        }
+        scores = self.test_building_batch(refined)
+        self.scheduler.record(scores)
 
-        return output
+        scored = [
+            (score, {key: float(values[i]) for key, values in refined.items()})
+            for i, score in enumerate(scores)
+        ]
+
+        return self.engine.to_nodes(scored, self.depth)
 
     def test_building_loc(self, x, z, building_id):
         '''
@@ -198,28 +631,247 @@ class BayesOpts:
         Returns:
         - The score of the building being evaluated
         '''
-        objective_score = 0
-
         building = self.dataset[int(building_id)]
-        x_max, _, z_max = self.generator.reader.get_data(building, "size")
-        x = int(min(self.per_max_x - x_max.value, x))
-        z = int(min(self.per_max_z - z_max.value, z))
+        x_max, z_max = self.footprint_sizes[int(building_id)]
+        clamped_x = int(min(self.per_max_x - x_max, x))
+        clamped_z = int(min(self.per_max_z - z_max, z))
+        self.evaluation = {}
+
+        grid = self.building_locations.grid
+        signature = self.building_locations.signature
+        if grid.collides(clamped_x, clamped_z, x_max, z_max, self.min_spacing):
+            self.evaluation["rejection"] = "collision"
+            objective_score = -100
+        elif self.level > 0:
+            objective_score = self.score_coarse(building, clamped_x, clamped_z, signature)
+        elif self.cache is None:
+            objective_score = self.score_building(building, clamped_x, clamped_z)
+        else:
+            cached = self.cache.get_score(signature, building, clamped_x, clamped_z)
+            if cached is None:
+                objective_score = self.score_building(building, clamped_x, clamped_z)
+                self.cache.set_score(
+                    signature, building, clamped_x, clamped_z, objective_score, self.evaluation
+                )
+            else:
+                objective_score, evaluation = cached
+                self.evaluation.update(evaluation, cached=True)
+
+        if self.trace is not None:
+            self.trace_evaluation(
+                x, z, building_id, clamped_x, clamped_z, objective_score, **self.evaluation
+            )
 
-        terrain = self.sub_map(x, z, building)
-        gradient_y, gradient_x = np.gradient(terrain)
-        steepness = np.mean(np.sqrt(gradient_x**2 + gradient_y**2))
+        return objective_score
+
+    def trace_evaluation(self, param_x, param_z, param_building_id, x, z, score, **details):
+        '''
+        Writes an evaluation to the trace, together with the current iteration, search depth and terrain level.
+
+        Parameters:
+        - param_x: x coordinate suggested by the search engine
+        - param_z: z coordinate suggested by the search engine
+        - param_building_id: building id suggested by the search engine
+        - x: clamped x coordinate of building
+        - z: clamped z coordinate of building
+        - score: The score of the evaluation
+        - details: Rejection reason, cache hit and sub-scores of the evaluation
+        '''
+        self.trace.write(
+            iteration=self.iteration,
+            depth=self.current_depth,
+            level=self.level,
+            param_x=float(param_x),
+            param_z=float(param_z),
+            param_building_id=float(param_building_id),
+            x=int(x),
+            z=int(z),
+            building_id=int(param_building_id),
+            score=float(score),
+            **details,
+        )
+
+    def score_building(self, building, x, z):
+        '''
+        Scores a building at an already clamped location.
+
+        Parameters:
+        - building: the name of the building being placed
+        - x: x coordinate of building
+        - z: z coordinate of building
+
+        Returns:
+        - The score of the building being evaluated
+        '''
+        x_max, _, z_max = self.generator.building_size(building)
+        px, pz = self.cord2map(x, z)
+        steepness = self.pyramid.mean_steepness(
+            self.level, px, pz, x_max, z_max, self.generator.footprint(building)
+        )
 
         if steepness > 0.25:
+            self.evaluation["rejection"] = "steepness"
             return -100
 
         building_output = self.generator.create_building(building, x, z)
 
         objective_score = self.generator.evaluate_obj(
-            building_output, self.building_locations
+            building_output, self.building_locations, *self.pyramid.maps(self.level)
         )
 
+        terms = self.generator.obj_func.terms
+        if not terms:
+            self.evaluation["rejection"] = "overlap"
+        self.evaluation.update(terms)
+
         return objective_score
 
+    def score_coarse(self, building, x, z, signature):
+        '''
+        Scores a building on the coarse terrain.
+        Locations are snapped to the coarse cells, so every cell and building is scored once per settlement state.
+
+        Parameters:
+        - building: the name of the building being placed
+        - x: clamped x coordinate of building
+        - z: clamped z coordinate of building
+        - signature: the signature of the placed buildings
+
+        Returns:
+        - The coarse score of the building
+        '''
+        if signature != self.coarse_signature:
+            self.coarse_scores.clear()
+            self.coarse_signature = signature
+
+        factor = 2**self.level
+        x = self.per_min_x + (x - self.per_min_x) // factor * factor
+        z = self.per_min_z + (z - self.per_min_z) // factor * factor
+
+        key = (building, x, z)
+        if key not in self.coarse_scores:
+            score = self.score_building(building, x, z)
+            self.coarse_scores[key] = (score, dict(self.evaluation))
+            return score
+
+        score, evaluation = self.coarse_scores[key]
+        self.evaluation.update(evaluation, cached=True)
+
+        return score
+
+    def test_building_batch(self, candidates):
+        """
+        Evaluates a population of buildings in one call.
+        Collisions are rejected in bulk and candidates that clamp to the same placement are scored once,
+        the remaining candidates are scored one by one with test_building_loc or spread over the workers.
+
+        Parameters:
+        - candidates: Dictionary of equally long arrays for x, z and building_id
+
+        Returns:
+        - An array with the score of every candidate
+        """
+        ids = np.asarray(candidates["building_id"], dtype=int)
+        sizes = self.footprint_sizes[ids]
+        xs = np.minimum(self.per_max_x - sizes[:, 0], candidates["x"]).astype(int)
+        zs = np.minimum(self.per_max_z - sizes[:, 1], candidates["z"]).astype(int)
+
+        # Reject colliding anchors in bulk, one collision mask per building
+        grid = self.building_locations.grid
+        colliding = np.zeros(len(ids), dtype=bool)
+        for building_id in np.unique(ids):
+            rows = ids == building_id
+            colliding[rows] = grid.collides(
+                xs[rows], zs[rows], *self.footprint_sizes[building_id], self.min_spacing
+            )
+
+        scores = np.full(len(ids), -100.0)
+        if self.trace is not None:
+            for i in np.flatnonzero(colliding):
+                self.trace_evaluation(
+                    candidates["x"][i],
+                    candidates["z"][i],
+                    candidates["building_id"][i],
+                    xs[i],
+                    zs[i],
+                    -100,
+                    rejection="collision",
+                )
+
+        if np.all(colliding):
+            return scores
+
+        # Candidates that round to the same placement only need one evaluation,
+        # the first candidate of each placement stands in for it in the trace
+        unique, first, inverse = np.unique(
+            np.stack([xs, zs, ids], axis=1)[~colliding],
+            axis=0,
+            return_index=True,
+            return_inverse=True,
+        )
+        params = np.stack(
+            [np.asarray(candidates[key], dtype=float) for key in ("x", "z", "building_id")],
+            axis=1,
+        )[np.flatnonzero(~colliding)[first]]
+        if self.pool is not None and len(unique) >= 2 * self.workers:
+            unique_scores = self.test_building_parallel(unique, params)
+        else:
+            unique_scores = np.array(
+                [self.test_building_loc(x, z, building_id) for x, z, building_id in params]
+            )
+        scores[~colliding] = unique_scores[inverse.ravel()]
+
+        return scores
+
+    def test_building_parallel(self, candidates, params):
+        """
+        Evaluates clamped candidates on the worker processes.
+        Cached scores are looked up first, only the remaining candidates are sent,
+        workers read the world and placed buildings from shared memory.
+
+        Parameters:
+        - candidates: An (n, 3) array of clamped x, z and building id
+        - params: An (n, 3) array of the x, z and building id suggested by the search engine
+
+        Returns:
+        - An array with the score of every candidate
+        """
+        signature = self.building_locations.signature
+        use_cache = self.cache is not None and self.level == 0
+        scores = np.empty(len(candidates))
+        pending = []
+        for i, (x, z, building_id) in enumerate(candidates.tolist()):
+            cached = None
+            if use_cache:
+                cached = self.cache.get_score(signature, self.dataset[building_id], x, z)
+            if cached is None:
+                pending.append(i)
+                continue
+
+            score, evaluation = cached
+            scores[i] = score
+            if self.trace is not None:
+                self.trace_evaluation(*params[i], x, z, score, **evaluation, cached=True)
+
+        chunks = [chunk for chunk in np.array_split(pending, self.workers) if len(chunk)]
+        futures = [
+            self.pool.submit(evaluate_candidates, self.level, candidates[chunk])
+            for chunk in chunks
+        ]
+
+        for chunk, future in zip(chunks, futures):
+            for i, (score, evaluation) in zip(chunk, future.result()):
+                x, z, building_id = candidates[i].tolist()
+                if use_cache:
+                    self.cache.set_score(
+                        signature, self.dataset[building_id], x, z, score, evaluation
+                    )
+                if self.trace is not None:
+                    self.trace_evaluation(*params[i], x, z, score, **evaluation)
+                scores[i] = score
+
+        return scores
+
     def sub_map(self, x, z, current_building):
         '''
         Maps area within the coordinates of the building.
@@ -237,10 +889,10 @@ class BayesOpts:
 
         x0, z0 = self.cord2map(x, z)
 
-        x_max, _, z_max = self.generator.reader.get_data(current_building, "size")
+        x_max, _, z_max = self.generator.building_size(current_building)
 
-        x1 = x0 + x_max.value - 1
-        z1 = z0 + z_max.value - 1
+        x1 = x0 + x_max - 1
+        z1 = z0 + z_max - 1
 
         # Use array slicing to extract the subset
         building_map = self.terrain_map[x0 : x1 + 1, z0 : z1 + 1]
@@ -278,32 +930,61 @@ class BayesOpts:
         z = int(node.params["z"])
         return x, z, id
 
-    def list_nbt_files(self, dataset):
-        '''
-        Lists all the buildings from the chosen dataset.
-
-        Parameters:
-        - File path the folder containing the nbt files for the dataset
-
-        '''
-        nbt_files = []
-        path = os.path.join("nbtData", dataset)
-
-        for root, _, files in os.walk(path):
-            for file_name in files:
-                if file_name.endswith(".nbt"):
-                    nbt_files.append(os.path.join(root, file_name))
-        return nbt_files
-
-    def build(self, params):
+    def build(self, params, diff=False):
         '''
         Builds the buildings in game
 
         Parameters:
         - params: information about the building to be placed
+        - diff: if True only the blocks that differ from the world are placed
         '''
         x, z, id = self.node2building(params)
-        self.generator.create_building(id, x, z, build=True)
+        self.generator.create_building(id, x, z, build=True, diff=diff)
+
+
+_evaluator = None
+
+
+def init_evaluator(descriptor, catalog, settings):
+    """
+    Prepares a worker process to evaluate buildings on a shared world.
+
+    Parameters:
+    - descriptor: The descriptor of the SharedWorld
+    - catalog: The BuildingCatalog of the optimizer
+    - settings: The optimizer parameters that change evaluations
+    """
+    global _evaluator
+
+    register_catalogs([catalog])
+    generator = generateRandomSample(shared=SharedWorldView(descriptor))
+    _evaluator = BayesOpts(
+        generator=generator, engine="evolutionary", cache=False, **settings
+    )
+
+
+def evaluate_candidates(level, candidates):
+    """
+    Evaluates candidates in a worker process, after catching up with the published placements.
+
+    Parameters:
+    - level: The terrain level to evaluate on
+    - candidates: An (n, 3) array of clamped x, z and building id
+
+    Returns:
+    - A list of (score, evaluation details) tuples
+    """
+    _evaluator.generator.shared.sync(
+        _evaluator.building_locations, _evaluator.dataset
+    )
+    _evaluator.level = level
+
+    results = []
+    for x, z, building_id in candidates.tolist():
+        score = _evaluator.test_building_loc(x, z, building_id)
+        results.append((score, _evaluator.evaluation))
+
+    return results
 
 
 if __name__ == "__main__":
@@ -315,23 +996,17 @@ if __name__ == "__main__":
         optimizer = BayesOpts(time=600, threshold=0, depth=1, n_steps=40)
         results = optimizer.optimize()
 
-        gen = generateRandomSample()
-        total_ind = 0
-        total_grp = 0
-        fin = 0
+        gen = optimizer.generator
         buildings = []
         for res in results:
             x, z, id = optimizer.node2building(res)
             buildings.append(gen.create_building(id, x, z))
 
-        for building in buildings:
-            other_results = [b for b in buildings if b != building]
-            ind, semi, tot = gen.get_individual_score(building, other_results)
-
-            total_ind += ind
-            total_grp += semi
-            if fin == 0:
-                fin = tot
+        # Every building is scored against all other buildings of the settlement
+        scores = gen.score_settlement(buildings)
+        total_ind = np.nansum(scores["individual_score"])
+        total_grp = np.nansum(scores["group_score"])
+        fin = np.mean(scores["total_score"]) if buildings else 0
 
         outputs.append([i, total_ind, total_grp, fin])
 
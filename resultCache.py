@@ -0,0 +1,312 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+from structureVariants import file_hash, parse_variant
+
+CACHE_DIR = os.path.join(".cache", "results")
+
+# Part of every cache key, bump it whenever a change to the objective or the search changes scores or results,
+# or the format of the stored scores changes
+SCORE_VERSION = 4
+
+# Scores are split over files by the first hex digits of the settlement signature
+SHARD_DIGITS = 2
+
+
+def hash_arrays(*arrays):
+    """
+    Parameters:
+    - arrays: numpy arrays to hash
+
+    Returns:
+    - The sha256 hex digest of the shapes, types and contents of the arrays
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        digest.update(array.tobytes())
+
+    return digest.hexdigest()
+
+
+def world_hash(generator):
+    """
+    Parameters:
+    - generator: The generateRandomSample of the build area
+
+    Returns:
+    - The content hash of the build area and its height maps
+    """
+    rect = generator.buildRect
+    return hash_arrays(
+        np.array([*rect.offset, *rect.size]),
+        *(generator.heightmaps[name] for name in sorted(generator.heightmaps)),
+    )
+
+
+def catalog_hash(catalog):
+    """
+    Parameters:
+    - catalog: The BuildingCatalog
+
+    Returns:
+    - The content hash of the catalog entries and their nbt files
+    """
+    digest = hashlib.sha256()
+    for name in catalog.paths:
+        digest.update(name.encode())
+        digest.update(file_hash(parse_variant(name)[0]).encode())
+
+    return digest.hexdigest()
+
+
+def write_json(file_path, data):
+    """
+    Writes a JSON file atomically, so concurrent runs never read a partial file.
+
+    Parameters:
+    - file_path: The path of the file to write
+    - data: The data to write
+    """
+    temporary = f"{file_path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, file_path)
+
+
+@contextmanager
+def file_lock(file_path, timeout=30):
+    """
+    Holds an exclusive lock file next to a file, so concurrent runs merge their updates one after another.
+    Locks older than the timeout are left over from a crashed run and are taken over.
+
+    Parameters:
+    - file_path: The path of the file to lock
+    - timeout: Seconds after which a lock is considered stale
+    """
+    lock = f"{file_path}.lock"
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > timeout:
+                    os.remove(lock)
+            except FileNotFoundError:
+                pass
+            time.sleep(0.01)
+
+    try:
+        yield
+    finally:
+        os.remove(lock)
+
+
+class ResultCache:
+
+    def __init__(self, world, catalog, parameters, seed, cache_dir=CACHE_DIR):
+        """
+        Content addressed cache of optimization results and evaluation scores.
+        Results are stored under a hash of the world, catalog, parameters, seed and SCORE_VERSION.
+        Evaluation scores only depend on the world, catalog, placed buildings, candidate and SCORE_VERSION,
+        so they are shared between runs that only differ in parameters such as the threshold.
+        Scores are sharded by the signature of the placed buildings, shards are read when first needed
+        and merged under a lock, so concurrent workers can share the cache.
+
+        Parameters:
+        - world: The content hash of the world, from world_hash
+        - catalog: The content hash of the building catalog, from catalog_hash
+        - parameters: Dictionary of the optimizer parameters
+        - seed: The random seed of the run
+        - cache_dir: The folder of the cache
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        run = json.dumps(
+            {
+                "version": SCORE_VERSION,
+                "world": world,
+                "catalog": catalog,
+                "parameters": parameters,
+                "seed": seed,
+            },
+            sort_keys=True,
+        )
+        self.run_key = hashlib.sha256(run.encode()).hexdigest()
+
+        # Scores only change with the parameters used inside an evaluation
+        evaluation = json.dumps(
+            {
+                "version": SCORE_VERSION,
+                "world": world,
+                "catalog": catalog,
+                "min_spacing": parameters.get("min_spacing", 0),
+            },
+            sort_keys=True,
+        )
+        self.score_key = hashlib.sha256(evaluation.encode()).hexdigest()
+
+        self.scores = {}
+        self.new_scores = {}
+        os.makedirs(self.scores_folder(), exist_ok=True)
+
+    def results_file(self):
+        """
+        Returns:
+        - The path of the results file of this run
+        """
+        return os.path.join(self.cache_dir, f"run_{self.run_key}.json")
+
+    def scores_folder(self):
+        """
+        Returns:
+        - The folder of the evaluation score shards shared by runs on the same world and catalog
+        """
+        return os.path.join(self.cache_dir, f"scores_{self.score_key}")
+
+    def shard_file(self, shard):
+        """
+        Parameters:
+        - shard: The leading hex digits of the signatures in the shard
+
+        Returns:
+        - The path of the shard file
+        """
+        return os.path.join(self.scores_folder(), f"{shard}.json")
+
+    def read_shard(self, shard):
+        """
+        Parameters:
+        - shard: The leading hex digits of the signatures in the shard
+
+        Returns:
+        - The scores stored in the shard file, empty if it does not exist
+        """
+        shard_file = self.shard_file(shard)
+        if not os.path.exists(shard_file):
+            return {}
+
+        with open(shard_file) as file:
+            return json.load(file)
+
+    def shard(self, shard):
+        """
+        Parameters:
+        - shard: The leading hex digits of the signatures in the shard
+
+        Returns:
+        - The scores of the shard, read from disk on first use
+        """
+        if shard not in self.scores:
+            self.scores[shard] = self.read_shard(shard)
+
+        return self.scores[shard]
+
+    def load_results(self):
+        """
+        Returns:
+        - The cached list of (score, params) results of this run, or None if the run was not cached
+        """
+        if not os.path.exists(self.results_file()):
+            return None
+
+        with open(self.results_file()) as file:
+            return [(entry["score"], entry["params"]) for entry in json.load(file)]
+
+    def save_results(self, results):
+        """
+        Stores the results of this run together with the new evaluation scores.
+
+        Parameters:
+        - results: A list of BuildingNodes
+        """
+        write_json(
+            self.results_file(),
+            [
+                {
+                    "score": float(node.score),
+                    "params": {key: float(value) for key, value in node.params.items()},
+                }
+                for node in results
+            ],
+        )
+        self.save_scores()
+
+    def save_scores(self):
+        """
+        Merges the new evaluation scores into the shards they belong to.
+        Every shard is re-read under its lock, so scores written by concurrent runs are kept.
+        """
+        for shard, new_scores in self.new_scores.items():
+            shard_file = self.shard_file(shard)
+            with file_lock(shard_file):
+                scores = self.read_shard(shard)
+                scores.update(new_scores)
+                write_json(shard_file, scores)
+            self.scores[shard] = scores
+
+        self.new_scores = {}
+
+    @staticmethod
+    def score_key_of(signature, building, x, z):
+        """
+        Returns:
+        - The key of an evaluation in the scores file
+        """
+        return f"{signature:016x}:{building}:{x}:{z}"
+
+    @staticmethod
+    def shard_of(signature):
+        """
+        Returns:
+        - The shard of the scores of a settlement signature
+        """
+        return f"{signature:016x}"[:SHARD_DIGITS]
+
+    def get_score(self, signature, building, x, z):
+        """
+        Parameters:
+        - signature: The signature of the placed buildings
+        - building: The name of the evaluated building
+        - x: The clamped x coordinate of the building
+        - z: The clamped z coordinate of the building
+
+        Returns:
+        - A tuple (score, evaluation details) of the cached evaluation, or None if it was not cached
+        """
+        entry = self.shard(self.shard_of(signature)).get(
+            self.score_key_of(signature, building, x, z)
+        )
+        if entry is None:
+            return None
+
+        details = {name: value for name, value in entry.items() if name != "score"}
+        return entry["score"], details
+
+    def set_score(self, signature, building, x, z, score, evaluation=None):
+        """
+        Stores the score of an evaluation together with its rejection reason and sub-scores.
+
+        Parameters:
+        - signature: The signature of the placed buildings
+        - building: The name of the evaluated building
+        - x: The clamped x coordinate of the building
+        - z: The clamped z coordinate of the building
+        - score: The score of the evaluation
+        - evaluation: Dictionary of the evaluation details, e.g. the rejection reason and sub-scores
+        """
+        shard = self.shard_of(signature)
+        key = self.score_key_of(signature, building, x, z)
+        entry = {"score": float(score)}
+        for name, value in (evaluation or {}).items():
+            if name != "cached":
+                entry[name] = value if isinstance(value, str) else float(value)
+
+        self.shard(shard)[key] = entry
+        self.new_scores.setdefault(shard, {})[key] = entry
@@ -0,0 +1,240 @@
+import numpy as np
+from terrainPyramid import rectangle_footprint
+from settlementState import ACCEPTABLE_RELATIONS, CATEGORIES, category_code
+
+
+def relation_matrix():
+    """
+    Returns:
+    - A boolean matrix where [a, b] is True if category code b is an acceptable neighbour of code a.
+      The last row and column stand for buildings without a category.
+    """
+    size = len(CATEGORIES) + 1
+    matrix = np.zeros((size, size), dtype=bool)
+    for code, category in enumerate(CATEGORIES):
+        for neighbour in ACCEPTABLE_RELATIONS[category]:
+            matrix[code, CATEGORIES.index(neighbour)] = True
+
+    return matrix
+
+
+class SettlementScorer:
+
+    def __init__(self, terrain_map, water_map, offset_x, offset_z, neighbors=3):
+        """
+        Scores every building of a finished settlement against all other buildings in one pass.
+        The terms match ObjectiveFunction.total_fitness of a building evaluated with the rest of the settlement placed.
+
+        Parameters:
+        - terrain_map: The height map of the area
+        - water_map: The map indicating water blocks
+        - offset_x: The x coordinate of the first map column
+        - offset_z: The z coordinate of the first map row
+        - neighbors: The number of closest buildings the relations term considers
+        """
+        self.terrain_map = np.asarray(terrain_map)
+        self.water_map = np.asarray(water_map)
+        self.offset = np.array([offset_x, offset_z])
+        self.neighbors = neighbors
+        self.relations = relation_matrix()
+
+    def score(self, buildings, footprints=None):
+        """
+        Parameters:
+        - buildings: A list of (file path, Box) tuples
+        - footprints: Optional x and z offset arrays of the blocks every building stands on, whole rectangles by default
+
+        Returns:
+        - Dictionary of arrays with one entry per building: the sub-scores of total_fitness,
+          overlap, individual_score, relation_score, group_score and total_score.
+          Overlapping buildings get a total score of -100 and NaN for the other scores.
+        """
+        n = len(buildings)
+        names = [str(name) for name, _ in buildings]
+        boxes = np.array(
+            [(*box.begin, *box.end) for _, box in buildings], dtype=np.int64
+        ).reshape(n, 6)
+        codes = np.array([category_code(name) for name in names], dtype=np.int64)
+
+        begin, end = boxes[:, :3], boxes[:, 3:]
+        size = end - begin
+        if footprints is None:
+            footprints = [rectangle_footprint(x, z) for x, _, z in size]
+        base = np.array([len(x) for x, _ in footprints], dtype=float)
+
+        overlap = self.overlaps(begin, end)
+        duplicate = self.duplicates(names, boxes)
+        distances = self.corner_distances(boxes)
+
+        spacing = np.where(
+            np.any((distances < 3) & (distances > 30), axis=1), -1, 1
+        )
+        relations, max_relations = self.neighbour_relations(codes, distances)
+        diversity = self.diversity(codes)
+        break_terrain, floating = self.terrain_terms(begin, footprints, codes)
+
+        total_buildings = np.full(n, n)
+        break_terrain = base + break_terrain
+        floating = base + floating
+        large = 0.05 * base
+
+        individual_score = (break_terrain + large + floating) / (2 * base + large)
+        relation_score = (spacing + relations + duplicate) / (
+            np.abs(spacing) + max_relations + np.abs(duplicate)
+        )
+        group_score = (
+            total_buildings + spacing + diversity + relations + duplicate
+        ) / (total_buildings + diversity)
+        total_score = (individual_score + group_score + relation_score) / 3
+
+        def rejected(values):
+            return np.where(overlap, np.nan, values)
+
+        return {
+            "overlap": overlap,
+            "total_buildings": rejected(total_buildings),
+            "break_terrain": rejected(break_terrain),
+            "floating": rejected(floating),
+            "spacing": rejected(spacing),
+            "diversity": rejected(diversity),
+            "large": rejected(large),
+            "relations": rejected(relations),
+            "max_relations": rejected(max_relations),
+            "duplicate": rejected(duplicate),
+            "individual_score": rejected(individual_score),
+            "relation_score": rejected(relation_score),
+            "group_score": rejected(group_score),
+            "total_score": np.where(overlap, -100, total_score),
+        }
+
+    @staticmethod
+    def overlaps(begin, end):
+        """
+        Parameters:
+        - begin: An (n, 3) array of the first block of every building
+        - end: An (n, 3) array of the block after the last of every building
+
+        Returns:
+        - A boolean array, True for buildings whose footprint touches or intersects another footprint,
+          like SettlementState.collides
+        """
+        begin, end = begin[:, [0, 2]], end[:, [0, 2]]
+        pairs = np.all(
+            (begin[:, None, :] <= end[None, :, :]) & (begin[None, :, :] <= end[:, None, :]),
+            axis=-1,
+        )
+        np.fill_diagonal(pairs, False)
+
+        return pairs.any(axis=1)
+
+    @staticmethod
+    def duplicates(names, boxes):
+        """
+        Parameters:
+        - names: The building name of every building
+        - boxes: An (n, 6) array of the begin and end corners
+
+        Returns:
+        - -1 for buildings placed more than once at the same location, otherwise 1
+        """
+        _, name_ids = np.unique(np.array(names, dtype=str), return_inverse=True)
+        keys = np.column_stack([name_ids.ravel(), boxes])
+        _, inverse, counts = np.unique(
+            keys, axis=0, return_inverse=True, return_counts=True
+        )
+
+        return np.where(counts[inverse.ravel()] > 1, -1, 1)
+
+    @staticmethod
+    def corner_distances(boxes):
+        """
+        Calculates the smallest distance between the (x, z) corners of every pair of buildings.
+
+        Parameters:
+        - boxes: An (n, 6) array of the begin and end corners
+
+        Returns:
+        - An (n, n) array of distances with infinity on the diagonal
+        """
+        corners = np.stack([boxes[:, [0, 2]], boxes[:, [3, 5]]], axis=1)
+        offsets = corners[:, None, :, None, :] - corners[None, :, None, :, :]
+        distances = np.sqrt(np.sum(offsets**2, axis=-1)).min(axis=(2, 3))
+        np.fill_diagonal(distances, np.inf)
+
+        return distances
+
+    def neighbour_relations(self, codes, distances):
+        """
+        Parameters:
+        - codes: The category code of every building
+        - distances: The (n, n) corner distances with infinity on the diagonal
+
+        Returns:
+        - A tuple with the relation score and the number of neighbours considered of every building
+        """
+        n = len(codes)
+        count = min(self.neighbors, n - 1) if n > 1 else 0
+
+        # Stable sort keeps the placement order between equally distant buildings
+        closest = np.argsort(distances, axis=1, kind="stable")[:, :count]
+        acceptable = self.relations[codes[:, None], codes[closest]]
+        relations = np.sum(np.where(acceptable, 1, -1), axis=1)
+
+        return relations, np.full(n, count)
+
+    @staticmethod
+    def diversity(codes):
+        """
+        Parameters:
+        - codes: The category code of every building
+
+        Returns:
+        - The number of unique categories of the other buildings together with each building
+        """
+        histogram = np.bincount(codes % (len(CATEGORIES) + 1), minlength=len(CATEGORIES) + 1)
+        own = histogram[codes]
+
+        # Removing a building only removes its category when it is the only one
+        others = np.count_nonzero(histogram) - (own == 1)
+
+        return others + (own - 1 == 0)
+
+    def terrain_terms(self, begin, footprints, codes):
+        """
+        Calculates the terrain penalties of all buildings from one flat array of their footprint cells.
+
+        Parameters:
+        - begin: An (n, 3) array of the first block of every building
+        - footprints: The x and z offset arrays of the blocks every building stands on
+        - codes: The category code of every building
+
+        Returns:
+        - A tuple (break terrain, floating) of penalties without the base area
+        """
+        n = len(codes)
+        start = np.abs(begin[:, [0, 2]] - self.offset)
+        areas = np.array([len(x) for x, _ in footprints], dtype=np.int64)
+
+        owner = np.repeat(np.arange(n), areas)
+        cell_x = start[owner, 0] + np.concatenate([x for x, _ in footprints] or [[]]).astype(np.int64)
+        cell_z = start[owner, 1] + np.concatenate([z for _, z in footprints] or [[]]).astype(np.int64)
+
+        # Buildings stand at the height under their first footprint block
+        first = np.cumsum(areas) - areas
+        base_height = self.terrain_map[cell_x[first], cell_z[first]]
+
+        # Footprints reaching past the map only cover the cells inside it
+        inside = (cell_x < self.terrain_map.shape[0]) & (cell_z < self.terrain_map.shape[1])
+        owner, cell_x, cell_z = owner[inside], cell_x[inside], cell_z[inside]
+
+        heights = self.terrain_map[cell_x, cell_z]
+        difference = heights - base_height[owner]
+        water = self.water_map[cell_x, cell_z]
+        is_water = codes[owner] == CATEGORIES.index("water")
+        wrong_ground = np.where(is_water, water == 0, water == 1)
+
+        break_terrain = -np.bincount(owner, np.maximum(difference, 0), minlength=n)
+        floating = -np.bincount(owner, np.maximum(-difference, 0), minlength=n)
+        floating -= 3 * np.bincount(owner, wrong_ground, minlength=n)
+
+        return break_terrain, floating
@@ -0,0 +1,207 @@
+import hashlib
+from functools import lru_cache
+import numpy as np
+
+CATEGORIES = ("entertainment", "food", "gov", "production", "residential", "water")
+
+# Categories a building of each category is happy to have as a close neighbour
+ACCEPTABLE_RELATIONS = {
+    "entertainment": ["residential", "entertainment", "water"],
+    "food": ["residential", "food", "production", "water"],
+    "gov": ["residential", "water", "gov"],
+    "production": ["food", "production", "residential", "water"],
+    "residential": [
+        "entertainment",
+        "residential",
+        "food",
+        "production",
+        "water",
+    ],
+    "water": [
+        "entertainment",
+        "residential",
+        "food",
+        "production",
+        "gov",
+        "water",
+    ],
+}
+
+
+@lru_cache(maxsize=None)
+def category_code(file_path):
+    """
+    Determines the integer category code of a building from its file path.
+
+    Parameters:
+    - file_path: The path to the nbt file of the building
+
+    Returns:
+    - The index of the category in CATEGORIES, or -1 if the building has no category
+    """
+    for code, category in enumerate(CATEGORIES):
+        if category in file_path:
+            return code
+
+    return -1
+
+
+class SettlementState:
+
+    def __init__(self, capacity=64, grid=None):
+        """
+        Incrementally maintained state of the placed buildings.
+        Placements are stored as arrays of category codes, building ids and footprints,
+        together with a category histogram and a hash set of placements that are updated on every insert.
+
+        Parameters:
+        - capacity: The initial number of buildings the arrays can hold
+        - grid: An optional OccupancyGrid that is updated with the footprint of every placed building
+        """
+        self.grid = grid
+        self.buildings = []
+        self.building_index = {}
+        self.count = 0
+
+        self.categories = np.empty(capacity, dtype=np.int8)
+        self.building_ids = np.empty(capacity, dtype=np.int32)
+        self.boxes = np.empty((capacity, 6), dtype=np.int64)
+
+        # The last bin counts the buildings without a category
+        self.histogram = np.zeros(len(CATEGORIES) + 1, dtype=np.int64)
+        self.placements = set()
+
+        # Order independent hash of the placements, stable across processes
+        self.signature = 0
+
+    @classmethod
+    def from_buildings(cls, buildings):
+        """
+        Creates a state from a list of placed buildings.
+
+        Parameters:
+        - buildings: A list of (file path, Box) tuples
+
+        Returns:
+        - The SettlementState holding the buildings
+        """
+        state = cls(capacity=max(64, len(buildings)))
+        for building in buildings:
+            state.add(building)
+
+        return state
+
+    @staticmethod
+    def placement_key(building):
+        """
+        Hashable key identifying a placement.
+
+        Parameters:
+        - building: A (file path, Box) tuple
+
+        Returns:
+        - A tuple of the file path and the begin and end corners of the building
+        """
+        name, box = building
+        return str(name), tuple(box.begin), tuple(box.end)
+
+    def add(self, building):
+        """
+        Adds a placed building and updates the aggregates.
+
+        Parameters:
+        - building: A (file path, Box) tuple
+        """
+        if self.count == len(self.categories):
+            self.grow()
+
+        name, box = building
+        code = category_code(str(name))
+        building_id = self.building_index.setdefault(str(name), len(self.building_index))
+
+        self.categories[self.count] = code
+        self.building_ids[self.count] = building_id
+        self.boxes[self.count] = (*box.begin, *box.end)
+        self.histogram[code] += 1
+        key = self.placement_key(building)
+        self.placements.add(key)
+        self.signature ^= int.from_bytes(
+            hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "big"
+        )
+        if self.grid is not None:
+            self.grid.add(box)
+
+        self.buildings.append(building)
+        self.count += 1
+
+    def grow(self):
+        """
+        Doubles the capacity of the arrays.
+        """
+        capacity = 2 * len(self.categories)
+        self.categories = np.resize(self.categories, capacity)
+        self.building_ids = np.resize(self.building_ids, capacity)
+        self.boxes = np.resize(self.boxes, (capacity, 6))
+
+    def contains(self, building):
+        """
+        Checks if a building is already placed at the same location.
+
+        Parameters:
+        - building: A (file path, Box) tuple
+
+        Returns:
+        - True if the placement exists, otherwise False
+        """
+        return self.placement_key(building) in self.placements
+
+    def diversity_with(self, code):
+        """
+        Counts the unique categories of the placed buildings together with one more building.
+
+        Parameters:
+        - code: The category code of the additional building
+
+        Returns:
+        - The number of unique categories
+        """
+        return int(np.count_nonzero(self.histogram)) + int(self.histogram[code] == 0)
+
+    def collides(self, box, buffer=0):
+        """
+        Checks if a building collides with a placed building, with the same rule as OccupancyGrid.collides_box.
+
+        Parameters:
+        - box: The Box of the building
+        - buffer: The number of free blocks to keep from placed buildings beyond the one touching rule (default is 0)
+
+        Returns:
+        - True if the (x, z) footprint of the building touches or overlaps a placed footprint, otherwise False
+        """
+        if self.grid is not None:
+            return self.grid.collides_box(box, buffer)
+
+        placed = self.footprints()
+        begin = np.array([box.begin[0], box.begin[2]]) - buffer
+        end = np.array([box.end[0], box.end[2]]) + buffer
+
+        return bool(
+            np.any(np.all((placed[:, 0] <= end) & (begin <= placed[:, 1]), axis=1))
+        )
+
+    def footprints(self):
+        """
+        Returns:
+        - An (n, 2, 2) array with the (x, z) begin and end corners of every placed building
+        """
+        boxes = self.boxes[: self.count]
+        return np.stack([boxes[:, [0, 2]], boxes[:, [3, 5]]], axis=1)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.buildings)
+
+    def __getitem__(self, index):
+        return self.buildings[index]
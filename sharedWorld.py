@@ -0,0 +1,216 @@
+from multiprocessing import shared_memory
+import numpy as np
+from terrainPyramid import TerrainPyramid
+
+ALIGNMENT = 64
+
+
+def publish_arrays(arrays):
+    """
+    Copies arrays into one named shared memory block.
+
+    Parameters:
+    - arrays: Dictionary of numpy arrays
+
+    Returns:
+    - A tuple (shared memory, descriptor, views), where the descriptor is a small picklable dictionary
+      that attach_arrays turns back into the arrays and views are writable arrays in the block
+    """
+    layout = {}
+    size = 0
+    for key, array in arrays.items():
+        array = np.asarray(array)
+        layout[key] = (size, array.shape, array.dtype.str)
+        size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    descriptor = {"name": memory.name, "arrays": layout}
+    views = views_of(memory, descriptor)
+    for key, array in arrays.items():
+        views[key][...] = array
+
+    return memory, descriptor, views
+
+
+def views_of(memory, descriptor):
+    """
+    Parameters:
+    - memory: The shared memory block
+    - descriptor: The descriptor from publish_arrays
+
+    Returns:
+    - Dictionary of arrays backed by the block
+    """
+    return {
+        key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+        for key, (offset, shape, dtype) in descriptor["arrays"].items()
+    }
+
+
+def attach_arrays(descriptor):
+    """
+    Attaches to a block published with publish_arrays without copying it.
+
+    Parameters:
+    - descriptor: The descriptor from publish_arrays
+
+    Returns:
+    - A tuple (shared memory, arrays), the arrays stay valid as long as the shared memory object is referenced
+    """
+    try:
+        memory = shared_memory.SharedMemory(name=descriptor["name"], track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource tracker,
+        # which unlinks it when the worker exits, so registration is skipped
+        from multiprocessing import resource_tracker
+
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            memory = shared_memory.SharedMemory(name=descriptor["name"])
+        finally:
+            resource_tracker.register = register
+
+    return memory, views_of(memory, descriptor)
+
+
+class SharedWorld:
+
+    def __init__(self, generator, levels=0, capacity=None):
+        """
+        Publishes the world data of a generator once in shared memory, for worker processes to attach to.
+        The build area, height maps, terrain pyramid and a table of placed buildings are stored in one block.
+        Placements are appended to the table and announced by bumping a version number,
+        so workers only read the rows that are new to them.
+
+        Parameters:
+        - generator: The generateRandomSample with the world data
+        - levels: The number of coarse terrain levels to publish
+        - capacity: The maximum number of placements, by default one per 4 columns of the build area
+        """
+        rect = generator.buildRect
+        terrain_map, water_map = generator.map_area()
+        pyramid = TerrainPyramid(terrain_map, water_map, levels)
+        if capacity is None:
+            capacity = int(rect.size[0] * rect.size[1]) // 4 + 1
+
+        # The full resolution level of the pyramid holds the terrain and water map
+        arrays = {
+            "area": np.array([*rect.offset, *rect.size], dtype=np.int64),
+            "ocean_floor": generator.heightmaps["OCEAN_FLOOR"],
+            "header": np.zeros(2, dtype=np.int64),
+            "placements": np.zeros((capacity, 7), dtype=np.int64),
+            **pyramid.to_arrays(),
+        }
+        self.memory, self.descriptor, self.arrays = publish_arrays(arrays)
+        self.descriptor["levels"] = levels
+
+    @property
+    def version(self):
+        """
+        The number of placement updates published so far.
+        """
+        return int(self.arrays["header"][0])
+
+    def add(self, building_id, box):
+        """
+        Publishes a placed building.
+
+        Parameters:
+        - building_id: The index of the building in its catalog
+        - box: The Box of the placed building
+        """
+        header, placements = self.arrays["header"], self.arrays["placements"]
+        count = int(header[1])
+        if count == len(placements):
+            raise ValueError(f"The shared world holds at most {len(placements)} placements")
+
+        # The row is complete before the count makes it visible
+        placements[count] = (building_id, *box.begin, *box.end)
+        header[1] = count + 1
+        header[0] += 1
+
+    def close(self):
+        """
+        Releases and removes the shared memory block.
+        """
+        self.arrays = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+class SharedWorldView:
+
+    def __init__(self, descriptor):
+        """
+        Read-only view of a SharedWorld in a worker process.
+
+        Parameters:
+        - descriptor: The descriptor of the SharedWorld
+        """
+        self.descriptor = descriptor
+        self.memory, self.arrays = attach_arrays(descriptor)
+        for name, array in self.arrays.items():
+            array.flags.writeable = False
+
+        offset_x, offset_z, size_x, size_z = self.arrays["area"].tolist()
+        self.offset = (offset_x, offset_z)
+        self.size = (size_x, size_z)
+        self.heightmaps = {
+            "MOTION_BLOCKING_NO_LEAVES": self.arrays["terrain_0"],
+            "OCEAN_FLOOR": self.arrays["ocean_floor"],
+        }
+        self.synced_version = 0
+
+    @property
+    def version(self):
+        """
+        The number of placement updates published so far.
+        """
+        return int(self.arrays["header"][0])
+
+    def maps(self):
+        """
+        Returns:
+        - The shared height map and water map of the build area
+        """
+        return self.arrays["terrain_0"], self.arrays["water_0"]
+
+    def pyramid(self, levels):
+        """
+        Parameters:
+        - levels: The number of coarse levels needed
+
+        Returns:
+        - A TerrainPyramid on the shared arrays, computed locally if fewer levels were published
+        """
+        if levels > self.descriptor["levels"]:
+            return TerrainPyramid(*self.maps(), levels)
+
+        return TerrainPyramid.from_arrays(self.arrays, levels)
+
+    def sync(self, state, paths):
+        """
+        Adds the placements published since the last sync to a settlement state.
+
+        Parameters:
+        - state: The SettlementState of the worker, holding a prefix of the published placements
+        - paths: The building names of the catalog the placements refer to
+
+        Returns:
+        - The number of added placements
+        """
+        if self.version == self.synced_version:
+            return 0
+
+        from buildingBox import Box
+        from glm import ivec3
+
+        self.synced_version = self.version
+        count = int(self.arrays["header"][1])
+        rows = self.arrays["placements"][state.count : count]
+        for building_id, *corners in rows.tolist():
+            begin, end = ivec3(*corners[:3]), ivec3(*corners[3:])
+            state.add((paths[building_id], Box(begin, end - begin)))
+
+        return len(rows)
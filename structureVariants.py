@@ -0,0 +1,416 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+ROTATIONS = (0, 90, 180, 270)
+AIR_BLOCKS = {"minecraft:air", "minecraft:cave_air", "minecraft:void_air"}
+CACHE_DIR = os.path.join(".cache", "structures")
+CACHE_VERSION = 2
+
+# Horizontal directions in clockwise order, used to transform block states
+DIRECTIONS = ("north", "east", "south", "west")
+RAIL_ORDER = ("north", "south", "east", "west")
+MIRRORED_SIDES = {"left": "right", "right": "left"}
+
+
+def variant_name(file_path, rotation=0, mirror=False):
+    """
+    Builds the name of a rotated and mirrored variant of a structure.
+    The original orientation keeps the plain file path, so existing names stay valid.
+
+    Parameters:
+    - file_path: The path to the nbt file of the structure
+    - rotation: The clockwise rotation in degrees, one of ROTATIONS
+    - mirror: If True the structure is mirrored along the x axis before rotating
+
+    Returns:
+    - The name of the variant, e.g. "nbtData/normal/food/barn.nbt@90m"
+    """
+    if rotation == 0 and not mirror:
+        return file_path
+
+    return f"{file_path}@{rotation}{'m' if mirror else ''}"
+
+
+def parse_variant(name):
+    """
+    Splits the name of a variant into its parts.
+
+    Parameters:
+    - name: A variant name from variant_name or a plain file path
+
+    Returns:
+    - A tuple (file path, rotation, mirror)
+    """
+    file_path, _, transform = str(name).partition("@")
+    if not transform:
+        return file_path, 0, False
+
+    return file_path, int(transform.rstrip("m")), transform.endswith("m")
+
+
+def transform_xz(x, z, rotation, mirror):
+    """
+    Applies a variant transform to x and z coordinates, in the same order as Minecraft (mirror, then rotate around the origin).
+
+    Parameters:
+    - x: The x coordinate(s)
+    - z: The z coordinate(s)
+    - rotation: The clockwise rotation in degrees
+    - mirror: If True x is mirrored before rotating
+
+    Returns:
+    - The transformed x and z coordinate(s)
+    """
+    if mirror:
+        x = -x
+
+    if rotation == 90:
+        return -z, x
+    if rotation == 180:
+        return -x, -z
+    if rotation == 270:
+        return z, -x
+
+    return x, z
+
+
+def variant_size(size, rotation):
+    """
+    Parameters:
+    - size: The (x, y, z) size of the structure
+    - rotation: The clockwise rotation in degrees
+
+    Returns:
+    - The (x, y, z) size of the rotated structure
+    """
+    size_x, size_y, size_z = size
+    if rotation in (90, 270):
+        return size_z, size_y, size_x
+
+    return size_x, size_y, size_z
+
+
+def variant_offset(size, rotation, mirror):
+    """
+    Calculates where the transformed structure starts relative to the placement position.
+    A variant placed at position - offset starts exactly at position.
+
+    Parameters:
+    - size: The (x, y, z) size of the structure
+    - rotation: The clockwise rotation in degrees
+    - mirror: If True the structure is mirrored
+
+    Returns:
+    - The (x, z) minimum corner of the transformed structure
+    """
+    corners_x = np.array([0, size[0] - 1, 0, size[0] - 1])
+    corners_z = np.array([0, 0, size[2] - 1, size[2] - 1])
+    x, z = transform_xz(corners_x, corners_z, rotation, mirror)
+
+    return int(x.min()), int(z.min())
+
+
+def transform_direction(direction, rotation, mirror):
+    """
+    Parameters:
+    - direction: A horizontal direction name, other values are returned unchanged
+    - rotation: The clockwise rotation in degrees
+    - mirror: If True the x axis is mirrored before rotating
+
+    Returns:
+    - The transformed direction
+    """
+    if direction not in DIRECTIONS:
+        return direction
+
+    index = DIRECTIONS.index(direction)
+    if mirror and direction in ("east", "west"):
+        index = (index + 2) % 4
+
+    return DIRECTIONS[(index + rotation // 90) % 4]
+
+
+def transform_properties(properties, rotation, mirror):
+    """
+    Transforms the orientation dependent block states of a block, like Minecraft does when placing a rotated structure.
+    Handles facing, axis, 16-step rotation, connection sides (fences, walls, panes), rail shapes and left/right states.
+
+    Parameters:
+    - properties: Dictionary of block states
+    - rotation: The clockwise rotation in degrees
+    - mirror: If True the x axis is mirrored before rotating
+
+    Returns:
+    - The transformed dictionary of block states
+    """
+    transformed = {}
+    for key, value in properties.items():
+        if key in DIRECTIONS:
+            key = transform_direction(key, rotation, mirror)
+        elif key == "facing":
+            value = transform_direction(value, rotation, mirror)
+        elif key == "axis" and value in ("x", "z") and rotation in (90, 270):
+            value = "z" if value == "x" else "x"
+        elif key == "rotation":
+            steps = int(value)
+            if mirror:
+                steps = (16 - steps) % 16
+            value = str((steps + 4 * (rotation // 90)) % 16)
+        elif key == "shape" and value.startswith("ascending_"):
+            value = "ascending_" + transform_direction(
+                value[len("ascending_") :], rotation, mirror
+            )
+        elif key == "shape" and all(part in DIRECTIONS for part in value.split("_")):
+            # Rail shapes are named in the order north, south, east, west
+            parts = [
+                transform_direction(part, rotation, mirror) for part in value.split("_")
+            ]
+            value = "_".join(sorted(parts, key=RAIL_ORDER.index))
+        elif mirror and key in ("shape", "hinge", "type"):
+            for side, other in MIRRORED_SIDES.items():
+                if value.endswith(side):
+                    value = value[: -len(side)] + other
+                    break
+
+        transformed[key] = value
+
+    return transformed
+
+
+class StructureVariant:
+
+    def __init__(self, name, size, positions, states, palette, block_data=None):
+        """
+        Block data of a structure in one orientation, with positions starting at (0, 0, 0).
+
+        Parameters:
+        - name: The variant name
+        - size: The (x, y, z) size of the variant
+        - positions: An (n, 3) array with the position of every block
+        - states: An array with the palette index of every block
+        - palette: A list of (name, properties) tuples
+        - block_data: Dictionary from block index to the SNBT data of its block entity
+        """
+        self.name = name
+        self.size = tuple(int(value) for value in size)
+        self.positions = positions
+        self.states = states
+        self.palette = palette
+        self.block_data = block_data if block_data is not None else {}
+
+    def transformed(self, rotation, mirror):
+        """
+        Creates a rotated and mirrored copy of this (untransformed) structure.
+
+        Parameters:
+        - rotation: The clockwise rotation in degrees
+        - mirror: If True the structure is mirrored along the x axis before rotating
+
+        Returns:
+        - The transformed StructureVariant
+        """
+        offset_x, offset_z = variant_offset(self.size, rotation, mirror)
+        x, z = transform_xz(
+            self.positions[:, 0], self.positions[:, 2], rotation, mirror
+        )
+        positions = np.stack(
+            [x - offset_x, self.positions[:, 1], z - offset_z], axis=1
+        ).astype(np.int32)
+
+        palette = [
+            (name, transform_properties(properties, rotation, mirror))
+            for name, properties in self.palette
+        ]
+
+        return StructureVariant(
+            variant_name(self.name, rotation, mirror),
+            variant_size(self.size, rotation),
+            positions,
+            self.states,
+            palette,
+            self.block_data,
+        )
+
+    def footprint(self):
+        """
+        Finds the cells the structure stands on: the (x, z) positions of the non-air blocks in its lowest layer.
+        Structures without any non-air block stand on their whole rectangle.
+
+        Returns:
+        - A tuple of x and z offset arrays, sorted by x and then z
+        """
+        solid = np.array([name not in AIR_BLOCKS for name, _ in self.palette], dtype=bool)
+        solid = solid[self.states] if len(self.states) else solid[:0]
+        if not solid.any():
+            x, z = np.meshgrid(
+                np.arange(self.size[0]), np.arange(self.size[2]), indexing="ij"
+            )
+            return x.ravel(), z.ravel()
+
+        positions = self.positions[solid]
+        bottom = positions[positions[:, 1] == positions[:, 1].min()]
+        cells = np.unique(bottom[:, [0, 2]], axis=0)
+
+        return cells[:, 0], cells[:, 1]
+
+    def save(self, file_path):
+        """
+        Writes the variant to an .npz file.
+
+        Parameters:
+        - file_path: The path of the file to write
+        """
+        np.savez(
+            file_path,
+            size=np.array(self.size),
+            positions=self.positions,
+            states=self.states,
+            palette=np.array(json.dumps(self.palette)),
+            block_data=np.array(json.dumps(self.block_data)),
+        )
+
+    @classmethod
+    def load(cls, name, file_path):
+        """
+        Reads a variant written with save.
+
+        Parameters:
+        - name: The variant name
+        - file_path: The path of the file to read
+
+        Returns:
+        - The StructureVariant
+        """
+        with np.load(file_path) as data:
+            palette = [tuple(entry) for entry in json.loads(str(data["palette"]))]
+            block_data = {
+                int(index): snbt
+                for index, snbt in json.loads(str(data["block_data"])).items()
+            }
+            return cls(
+                name,
+                data["size"],
+                data["positions"],
+                data["states"],
+                palette,
+                block_data,
+            )
+
+
+_variants = {}
+
+
+def file_hash(file_path):
+    """
+    Parameters:
+    - file_path: The path to a file
+
+    Returns:
+    - The sha1 hex digest of the file contents
+    """
+    with open(file_path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+_sizes = {}
+_footprints = {}
+
+
+def structure_size(name):
+    """
+    Returns the size of a variant, reading the structure only if no catalog registered it.
+
+    Parameters:
+    - name: A variant name or plain file path
+
+    Returns:
+    - A tuple with the x, y and z size of the variant
+    """
+    if name not in _sizes:
+        file_path, rotation, _ = parse_variant(name)
+        _sizes[name] = tuple(variant_size(get_variant(file_path).size, rotation))
+
+    return _sizes[name]
+
+
+def variant_footprint(name):
+    """
+    Returns the bottom layer footprint of a variant, transformed from the footprint of the original structure.
+
+    Parameters:
+    - name: A variant name or plain file path
+
+    Returns:
+    - A tuple of x and z offset arrays from the origin of the variant, sorted by x and then z
+    """
+    if name not in _footprints:
+        file_path, rotation, mirror = parse_variant(name)
+        variant = get_variant(file_path)
+        x, z = variant.footprint()
+        if rotation != 0 or mirror:
+            offset_x, offset_z = variant_offset(variant.size, rotation, mirror)
+            x, z = transform_xz(x, z, rotation, mirror)
+            x, z = x - offset_x, z - offset_z
+            order = np.lexsort((z, x))
+            x, z = x[order], z[order]
+
+        _footprints[name] = (x.astype(np.int64), z.astype(np.int64))
+
+    return _footprints[name]
+
+
+def cache_structure(name, size, footprint):
+    """
+    Stores the already known size and footprint of a variant, so evaluations never read its nbt file.
+
+    Parameters:
+    - name: A variant name or plain file path
+    - size: The x, y and z size of the variant
+    - footprint: A tuple of x and z offset arrays
+    """
+    _sizes[name] = tuple(int(value) for value in size)
+    _footprints[name] = footprint
+
+
+def get_variant(name, cache_dir=CACHE_DIR):
+    """
+    Returns the block data of a variant.
+    Variants are transformed once and cached in memory and on disk, keyed by the contents of the nbt file.
+
+    Parameters:
+    - name: A variant name or plain file path
+    - cache_dir: The folder of the disk cache, None disables it
+
+    Returns:
+    - The StructureVariant
+    """
+    if name in _variants:
+        return _variants[name]
+
+    file_path, rotation, mirror = parse_variant(name)
+    cache_file = None
+    if cache_dir is not None:
+        suffix = f"{rotation}{'m' if mirror else ''}"
+        cache_file = os.path.join(
+            cache_dir, f"{file_hash(file_path)}_v{CACHE_VERSION}_{suffix}.npz"
+        )
+
+    if cache_file is not None and os.path.exists(cache_file):
+        variant = StructureVariant.load(name, cache_file)
+    else:
+        if rotation == 0 and not mirror:
+            from nbt_reader import nbt_reader
+
+            variant = StructureVariant(file_path, *nbt_reader().get_voxels(file_path))
+        else:
+            variant = get_variant(file_path, cache_dir).transformed(rotation, mirror)
+
+        if cache_file is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            variant.save(cache_file)
+
+    _variants[name] = variant
+
+    return variant
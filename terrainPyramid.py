@@ -0,0 +1,203 @@
+import numpy as np
+
+
+def rectangle_footprint(size_x, size_z):
+    """
+    Parameters:
+    - size_x: The width of the rectangle
+    - size_z: The depth of the rectangle
+
+    Returns:
+    - A tuple of x and z offset arrays covering the whole rectangle, sorted by x and then z
+    """
+    x, z = np.meshgrid(np.arange(size_x), np.arange(size_z), indexing="ij")
+    return x.ravel(), z.ravel()
+
+
+def footprint_cells(x0, z0, footprint, shape, scale=1):
+    """
+    Converts a footprint to the map cells it covers, with the number of footprint blocks in every cell.
+
+    Parameters:
+    - x0: The first full resolution map column of the building
+    - z0: The first full resolution map row of the building
+    - footprint: A tuple of x and z offset arrays of the blocks the building stands on
+    - shape: The shape of the map the cells index
+    - scale: The number of blocks per cell side
+
+    Returns:
+    - A tuple (x, z, weights) of cell indices inside the map and the blocks covering each cell
+    """
+    x = (x0 + footprint[0]) // scale
+    z = (z0 + footprint[1]) // scale
+
+    # Footprints reaching past the map only cover the cells inside it
+    inside = (x < shape[0]) & (z < shape[1])
+    x, z = x[inside], z[inside]
+    if scale == 1:
+        return x, z, np.ones(len(x))
+
+    cells, weights = np.unique(x * shape[1] + z, return_counts=True)
+
+    return cells // shape[1], cells % shape[1], weights.astype(float)
+
+
+class TerrainPyramid:
+
+    def __init__(self, terrain_map, water_map, levels=0):
+        """
+        Downsampled copies of the terrain and water maps with precomputed steepness grids.
+        Level k averages blocks of 2^k by 2^k cells, level 0 holds the full resolution maps.
+
+        Parameters:
+        - terrain_map: The height map of the area
+        - water_map: The map indicating water blocks
+        - levels: The number of coarse levels to build on top of the full resolution
+        """
+        self.terrain = [np.asarray(terrain_map)]
+        self.water = [np.asarray(water_map)]
+
+        for level in range(1, levels + 1):
+            factor = 2**level
+            self.terrain.append(self.downsample(terrain_map, factor))
+            self.water.append(
+                (self.downsample(water_map, factor) >= 0.5).astype(np.asarray(water_map).dtype)
+            )
+
+        # Summed-area tables of the slope per block, so the mean steepness of any rectangle costs O(1).
+        # The slope grids themselves serve footprints that do not fill their rectangle.
+        self.slopes = []
+        self.steepness_tables = []
+        for level, terrain in enumerate(self.terrain):
+            gradient_y, gradient_x = np.gradient(terrain.astype(float))
+            steepness = np.sqrt(gradient_x**2 + gradient_y**2) / 2**level
+            self.slopes.append(steepness)
+
+            table = np.zeros((terrain.shape[0] + 1, terrain.shape[1] + 1))
+            table[1:, 1:] = steepness.cumsum(axis=0).cumsum(axis=1)
+            self.steepness_tables.append(table)
+
+    @classmethod
+    def from_arrays(cls, arrays, levels):
+        """
+        Creates a pyramid from arrays exported with to_arrays, without copying or recomputing them.
+
+        Parameters:
+        - arrays: Dictionary of arrays from to_arrays
+        - levels: The number of coarse levels to use
+
+        Returns:
+        - The TerrainPyramid
+        """
+        pyramid = cls.__new__(cls)
+        pyramid.terrain = [arrays[f"terrain_{level}"] for level in range(levels + 1)]
+        pyramid.water = [arrays[f"water_{level}"] for level in range(levels + 1)]
+        pyramid.slopes = [arrays[f"slope_{level}"] for level in range(levels + 1)]
+        pyramid.steepness_tables = [
+            arrays[f"steepness_{level}"] for level in range(levels + 1)
+        ]
+
+        return pyramid
+
+    def to_arrays(self):
+        """
+        Returns:
+        - Dictionary with the maps, slope grids and steepness tables of every level
+        """
+        arrays = {}
+        for level in range(self.levels + 1):
+            arrays[f"terrain_{level}"] = self.terrain[level]
+            arrays[f"water_{level}"] = self.water[level]
+            arrays[f"slope_{level}"] = self.slopes[level]
+            arrays[f"steepness_{level}"] = self.steepness_tables[level]
+
+        return arrays
+
+    @staticmethod
+    def downsample(array, factor):
+        """
+        Averages blocks of factor by factor cells, padding the edges by repeating the last cells.
+
+        Parameters:
+        - array: The 2D array to downsample
+        - factor: The size of the blocks
+
+        Returns:
+        - The downsampled array
+        """
+        array = np.asarray(array, dtype=float)
+        pad_x = -array.shape[0] % factor
+        pad_z = -array.shape[1] % factor
+        array = np.pad(array, ((0, pad_x), (0, pad_z)), mode="edge")
+
+        return array.reshape(
+            array.shape[0] // factor, factor, array.shape[1] // factor, factor
+        ).mean(axis=(1, 3))
+
+    @property
+    def levels(self):
+        """
+        The number of coarse levels above the full resolution.
+        """
+        return len(self.terrain) - 1
+
+    def maps(self, level):
+        """
+        Parameters:
+        - level: The pyramid level
+
+        Returns:
+        - A tuple (terrain map, water map, scale) of the level, where scale is the number of blocks per cell side
+        """
+        return self.terrain[level], self.water[level], 2**level
+
+    def cells(self, level, x0, z0, size_x, size_z):
+        """
+        Converts a footprint in full resolution map indices to the cells it covers on a level.
+
+        Parameters:
+        - level: The pyramid level
+        - x0: The first map column of the footprint
+        - z0: The first map row of the footprint
+        - size_x: The width of the footprint
+        - size_z: The depth of the footprint
+
+        Returns:
+        - A tuple (x0, x1, z0, z1) of cell indices, with x1 and z1 exclusive
+        """
+        scale = 2**level
+        return (
+            x0 // scale,
+            (x0 + size_x - 1) // scale + 1,
+            z0 // scale,
+            (z0 + size_z - 1) // scale + 1,
+        )
+
+    def mean_steepness(self, level, x0, z0, size_x, size_z, footprint=None):
+        """
+        Calculates the mean slope of the terrain under a footprint.
+
+        Parameters:
+        - level: The pyramid level to read
+        - x0: The first map column of the footprint
+        - z0: The first map row of the footprint
+        - size_x: The width of the footprint
+        - size_z: The depth of the footprint
+        - footprint: Optional x and z offset arrays of the blocks the building stands on, the whole rectangle otherwise
+
+        Returns:
+        - The mean slope per block under the footprint
+        """
+        if footprint is not None and len(footprint[0]) < size_x * size_z:
+            slope = self.slopes[level]
+            x, z, weights = footprint_cells(x0, z0, footprint, slope.shape, 2**level)
+            return np.dot(slope[x, z], weights) / max(1, weights.sum())
+
+        table = self.steepness_tables[level]
+        cx0, cx1, cz0, cz1 = self.cells(level, x0, z0, size_x, size_z)
+        cx1 = min(cx1, table.shape[0] - 1)
+        cz1 = min(cz1, table.shape[1] - 1)
+
+        total = table[cx1, cz1] - table[cx0, cz1] - table[cx1, cz0] + table[cx0, cz0]
+
+        return total / max(1, (cx1 - cx0) * (cz1 - cz0))
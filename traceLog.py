@@ -0,0 +1,140 @@
+import glob
+import json
+import os
+import time
+import numpy as np
+
+# Columns of a trace with the value of records that do not set them
+COLUMNS = {
+    "time": np.nan,
+    "iteration": -1,
+    "depth": -1,
+    "level": 0,
+    "param_x": np.nan,
+    "param_z": np.nan,
+    "param_building_id": np.nan,
+    "x": -1,
+    "z": -1,
+    "building_id": -1,
+    "score": np.nan,
+    "rejection": "",
+    "cached": False,
+    "total_buildings": np.nan,
+    "break_terrain": np.nan,
+    "floating": np.nan,
+    "spacing": np.nan,
+    "diversity": np.nan,
+    "large": np.nan,
+    "relations": np.nan,
+    "max_relations": np.nan,
+    "duplicate": np.nan,
+    "individual_score": np.nan,
+    "relation_score": np.nan,
+    "group_score": np.nan,
+}
+
+
+class TraceWriter:
+
+    def __init__(self, path, metadata=None, buffer_size=65536):
+        """
+        Streams evaluation records to a folder of column-oriented .npz parts.
+        Records are buffered per column and every full buffer is written as one part, so memory use stays constant.
+        An earlier trace in the folder is only replaced once the first record is written,
+        so runs that evaluate nothing, such as runs restored from the result cache, keep it.
+
+        Parameters:
+        - path: The folder of the trace
+        - metadata: Dictionary stored as metadata.json next to the parts, e.g. the parameters and building names
+        - buffer_size: The number of records per part
+        """
+        self.path = path
+        self.metadata = metadata or {}
+        self.buffer_size = buffer_size
+        self.started = False
+
+        self.columns = {name: [] for name in COLUMNS}
+        self.parts = 0
+        self.start = time.perf_counter()
+
+    def begin(self):
+        """
+        Removes the parts of an earlier trace in the folder and writes the metadata.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        for part in glob.glob(os.path.join(self.path, "part-*.npz")):
+            os.remove(part)
+
+        with open(os.path.join(self.path, "metadata.json"), "w") as file:
+            json.dump(self.metadata, file)
+
+        self.started = True
+
+    def __len__(self):
+        return len(self.columns["time"])
+
+    def write(self, **record):
+        """
+        Adds a record, columns it does not set get their default value.
+
+        Parameters:
+        - record: Values by column name, see COLUMNS
+        """
+        if not self.started:
+            self.begin()
+
+        record["time"] = time.perf_counter() - self.start
+        for name, default in COLUMNS.items():
+            self.columns[name].append(record.get(name, default))
+
+        if len(self) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered records as a new part.
+        """
+        if len(self) == 0:
+            return
+
+        arrays = {
+            name: np.array(values, dtype=type(COLUMNS[name]))
+            for name, values in self.columns.items()
+        }
+        np.savez(os.path.join(self.path, f"part-{self.parts:05d}.npz"), **arrays)
+
+        self.parts += 1
+        self.columns = {name: [] for name in COLUMNS}
+
+    def close(self):
+        """
+        Writes the remaining records.
+        """
+        self.flush()
+
+
+def load_trace(path):
+    """
+    Reads a trace written by TraceWriter.
+
+    Parameters:
+    - path: The folder of the trace
+
+    Returns:
+    - A tuple (columns, metadata), where columns maps every column name to one array over all parts.
+      pandas.DataFrame(columns) gives a table of the trace.
+    """
+    with open(os.path.join(path, "metadata.json")) as file:
+        metadata = json.load(file)
+
+    parts = sorted(glob.glob(os.path.join(path, "part-*.npz")))
+    columns = {name: [] for name in COLUMNS}
+    for part in parts:
+        with np.load(part) as data:
+            for name in COLUMNS:
+                columns[name].append(data[name])
+
+    return {
+        name: np.concatenate(values) if values else np.array([])
+        for name, values in columns.items()
+    }, metadata